@@ -0,0 +1,40 @@
+"""Add outboxemail table for queued emails
+
+Revision ID: 2d8e6f1a4b73
+Revises: 7b3e5a9c2d41
+Create Date: 2026-10-18 13:26:41.208377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '2d8e6f1a4b73'
+down_revision = '7b3e5a9c2d41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'outboxemail',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('email_to', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+        sa.Column('subject', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('html_content', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_error', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        op.f('ix_outboxemail_next_attempt_at'), 'outboxemail', ['next_attempt_at'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index(op.f('ix_outboxemail_next_attempt_at'), table_name='outboxemail')
+    op.drop_table('outboxemail')
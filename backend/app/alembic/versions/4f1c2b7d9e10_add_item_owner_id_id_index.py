@@ -0,0 +1,36 @@
+"""Add (owner_id, id) index to item for keyset pagination
+
+Revision ID: 4f1c2b7d9e10
+Revises: 1a31ce608336
+Create Date: 2026-10-18 09:12:40.311842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '4f1c2b7d9e10'
+down_revision = '1a31ce608336'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_item_owner_id_id',
+            'item',
+            ['owner_id', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_item_owner_id_id', table_name='item', postgresql_concurrently=True
+        )
@@ -0,0 +1,56 @@
+"""Add search_vector to item, with a GIN index for full text search
+
+Revision ID: 5a7c9e1d3b62
+Revises: 8e4d2c6b1f35
+Create Date: 2026-10-18 18:27:05.916420
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5a7c9e1d3b62'
+down_revision = '8e4d2c6b1f35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Computed for the existing rows too, this rewrites the table
+    op.add_column(
+        'item',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', title), 'A') || "
+                "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_item_search_vector',
+            'item',
+            ['search_vector'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_item_search_vector',
+            table_name='item',
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+    op.drop_column('item', 'search_vector')
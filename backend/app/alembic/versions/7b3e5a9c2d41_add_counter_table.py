@@ -0,0 +1,41 @@
+"""Add counter table with maintained user and item counts
+
+Revision ID: 7b3e5a9c2d41
+Revises: 4f1c2b7d9e10
+Create Date: 2026-10-18 11:02:17.540213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3e5a9c2d41'
+down_revision = '4f1c2b7d9e10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'counter',
+        sa.Column('name', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    # Backfill from the current rows, the API keeps them up to date from here on
+    op.execute(
+        """
+        INSERT INTO counter (name, value)
+        SELECT 'user', count(*) FROM "user"
+        UNION ALL
+        SELECT 'item', count(*) FROM item
+        UNION ALL
+        SELECT 'item:' || owner_id, count(*) FROM item GROUP BY owner_id
+        """
+    )
+
+
+def downgrade():
+    op.drop_table('counter')
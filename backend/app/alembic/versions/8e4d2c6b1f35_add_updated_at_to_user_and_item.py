@@ -0,0 +1,44 @@
+"""Add updated_at to user and item
+
+Revision ID: 8e4d2c6b1f35
+Revises: 2d8e6f1a4b73
+Create Date: 2026-10-18 16:02:18.504113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4d2c6b1f35'
+down_revision = '2d8e6f1a4b73'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows start at the time of the migration
+    op.add_column(
+        'user',
+        sa.Column(
+            'updated_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+    )
+    op.add_column(
+        'item',
+        sa.Column(
+            'updated_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+    )
+
+
+def downgrade():
+    op.drop_column('item', 'updated_at')
+    op.drop_column('user', 'updated_at')
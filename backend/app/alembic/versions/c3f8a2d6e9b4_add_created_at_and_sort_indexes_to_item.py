@@ -0,0 +1,52 @@
+"""Add created_at to item, and the indexes of the item sort orders
+
+Revision ID: c3f8a2d6e9b4
+Revises: 5a7c9e1d3b62
+Create Date: 2026-10-18 20:41:53.274018
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f8a2d6e9b4'
+down_revision = '5a7c9e1d3b62'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_item_created_at_id', ['created_at', 'id']),
+    ('ix_item_owner_id_created_at_id', ['owner_id', 'created_at', 'id']),
+    ('ix_item_updated_at_id', ['updated_at', 'id']),
+    ('ix_item_owner_id_updated_at_id', ['owner_id', 'updated_at', 'id']),
+    ('ix_item_title_id', [sa.text('title COLLATE "C"'), 'id']),
+    ('ix_item_owner_id_title_id', ['owner_id', sa.text('title COLLATE "C"'), 'id']),
+]
+
+
+def upgrade():
+    # Existing rows start at the time of the migration
+    op.add_column(
+        'item',
+        sa.Column(
+            'created_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+    )
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(
+                name, 'item', columns, unique=False, postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='item', postgresql_concurrently=True)
+    op.drop_column('item', 'created_at')
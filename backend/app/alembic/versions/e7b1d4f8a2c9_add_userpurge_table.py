@@ -0,0 +1,31 @@
+"""Add userpurge table for users whose items are deleted in the background
+
+Revision ID: e7b1d4f8a2c9
+Revises: c3f8a2d6e9b4
+Create Date: 2026-10-18 22:14:37.602195
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b1d4f8a2c9'
+down_revision = 'c3f8a2d6e9b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'userpurge',
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+
+
+def downgrade():
+    op.drop_table('userpurge')
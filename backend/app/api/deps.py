@@ -1,4 +1,5 @@
-from collections.abc import Generator
+import logging
+from collections.abc import AsyncGenerator, Generator
 from typing import Annotated
 
 import jwt
@@ -6,13 +7,19 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
+from sqlalchemy import exc
+from sqlalchemy.orm import make_transient_to_detached
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core import security
+from app.core.cache import user_cache, wrote_recently
 from app.core.config import settings
-from app.core.db import engine
+from app.core.db import async_engine, async_replicas, engine, replicas
 from app.models import TokenPayload, User
 
+logger = logging.getLogger(__name__)
+
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
 )
@@ -23,22 +30,31 @@ def get_db() -> Generator[Session, None, None]:
         yield session
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    # Expired attributes would need IO on access, which can't happen implicitly
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
 SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
+def _decode_token(token: str) -> TokenPayload:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
         )
-        token_data = TokenPayload(**payload)
+        return TokenPayload(**payload)
     except (InvalidTokenError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = session.get(User, token_data.sub)
+
+
+def _check_user(user: User | None) -> User:
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
@@ -46,7 +62,97 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
     return user
 
 
+def _get_cached_user(user_id: str) -> User | None:
+    data = user_cache.get(user_id)
+    if data is None:
+        return None
+    # Rebuild it as if loaded by this session, without a round trip. The
+    # password hash isn't cached, it's loaded on access
+    user = User(**data)
+    make_transient_to_detached(user)
+    return user
+
+
+def _cache_user(user_id: str | None, user: User | None, version: int) -> None:
+    # Skipped when a user was invalidated since `version`, the row could be
+    # older than the change
+    if user_id and user:
+        data = user.model_dump(exclude={"hashed_password"})
+        user_cache.set(user_id, data, version=version)
+
+
+def get_current_user(session: SessionDep, token: TokenDep) -> User:
+    token_data = _decode_token(token)
+    user = _get_cached_user(str(token_data.sub))
+    if user:
+        session.add(user)
+    else:
+        version = user_cache.version
+        user = session.get(User, token_data.sub)
+        _cache_user(token_data.sub, user, version)
+    user = _check_user(user)
+    session.info["user_id"] = user.id
+    return user
+
+
+async def get_current_user_async(session: AsyncSessionDep, token: TokenDep) -> User:
+    token_data = _decode_token(token)
+    user = _get_cached_user(str(token_data.sub))
+    if user:
+        session.add(user)
+    else:
+        version = user_cache.version
+        user = await session.get(User, token_data.sub)
+        _cache_user(token_data.sub, user, version)
+    user = _check_user(user)
+    session.info["user_id"] = user.id
+    return user
+
+
 CurrentUser = Annotated[User, Depends(get_current_user)]
+AsyncCurrentUser = Annotated[User, Depends(get_current_user_async)]
+
+
+def get_read_db(
+    session: SessionDep, current_user: CurrentUser
+) -> Generator[Session, None, None]:
+    """
+    Session for read only routes, on a replica unless the user wrote recently.
+    Falls back to the primary when no replica can be reached.
+    """
+    if not wrote_recently(current_user.id):
+        for replica in replicas.candidates():
+            with Session(replica) as replica_session:
+                try:
+                    replica_session.connection()
+                except exc.OperationalError as e:
+                    logger.warning(f"replica {replica.url!r} unavailable: {e}")
+                    replicas.mark_down(replica)
+                    continue
+                yield replica_session
+                return
+    yield session
+
+
+async def get_async_read_db(
+    session: AsyncSessionDep, current_user: AsyncCurrentUser
+) -> AsyncGenerator[AsyncSession, None]:
+    if not wrote_recently(current_user.id):
+        for replica in async_replicas.candidates():
+            async with AsyncSession(replica, expire_on_commit=False) as replica_session:
+                try:
+                    await replica_session.connection()
+                except exc.OperationalError as e:
+                    logger.warning(f"replica {replica.url!r} unavailable: {e}")
+                    async_replicas.mark_down(replica)
+                    continue
+                yield replica_session
+                return
+    yield session
+
+
+ReadSessionDep = Annotated[Session, Depends(get_read_db)]
+AsyncReadSessionDep = Annotated[AsyncSession, Depends(get_async_read_db)]
 
 
 def get_current_active_superuser(current_user: CurrentUser) -> User:
@@ -0,0 +1,41 @@
+import hashlib
+from collections.abc import Iterable
+from typing import Any
+
+from fastapi import Request, Response
+
+
+def row_etag(row: Any) -> str:
+    """
+    Weak ETag of a single item or user, from its id and `updated_at`.
+    """
+    return f'W/"{row.id.hex}-{row.updated_at.timestamp():.6f}"'
+
+
+def page_etag(rows: Iterable[Any], *values: Any) -> str:
+    """
+    Weak ETag of a list page, from the id and `updated_at` of its rows and the
+    other `values` of the response, like the count.
+    """
+    digest = hashlib.blake2b(repr(values).encode(), digest_size=16)
+    for row in rows:
+        digest.update(f"{row.id.hex}-{row.updated_at.timestamp():.6f}".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison, the W/ prefix is ignored on both sides
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Response | None:
+    """
+    Set the ETag of `response`, and return an empty 304 to send instead when
+    the client already has this version.
+    """
+    response.headers["ETag"] = etag
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
@@ -0,0 +1,75 @@
+import csv
+import io
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any, Literal
+
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from sqlmodel import Session, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db import async_engine, engine
+
+ExportFormat = Literal["ndjson", "csv"]
+
+# Rows fetched from the server side cursor at a time, and sent as one chunk
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _header(fields: list[str], format: ExportFormat) -> bytes:
+    if format == "csv":
+        return _encode([fields], fields, format)
+    return b""
+
+
+def _encode(rows: Sequence[Any], fields: list[str], format: ExportFormat) -> bytes:
+    if format == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode()
+    return b"".join(
+        to_json({field: getattr(row, field) for field in fields}) + b"\n"
+        for row in rows
+    )
+
+
+def export_rows(
+    statement: Any, model: type[SQLModel], format: ExportFormat
+) -> Iterator[bytes]:
+    """
+    Stream the rows of `statement` from a server side cursor, in batches, with
+    the fields of `model` as NDJSON objects or CSV columns.
+
+    It opens its own session, the one of the request is closed before the
+    response body is sent.
+    """
+    fields = list(model.model_fields)
+    yield _header(fields, format)
+    with Session(engine) as session:
+        statement = statement.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        for rows in session.exec(statement).partitions():
+            yield _encode(rows, fields, format)
+
+
+async def export_rows_async(
+    statement: Any, model: type[SQLModel], format: ExportFormat
+) -> AsyncIterator[bytes]:
+    fields = list(model.model_fields)
+    yield _header(fields, format)
+    async with AsyncSession(async_engine) as session:
+        statement = statement.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        result = await session.stream(statement)
+        async for rows in result.partitions():
+            yield _encode(rows, fields, format)
+
+
+def export_response(
+    content: Iterator[bytes] | AsyncIterator[bytes], name: str, format: ExportFormat
+) -> StreamingResponse:
+    return StreamingResponse(
+        content,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'},
+    )
@@ -0,0 +1,110 @@
+import csv
+from collections.abc import Iterator
+from typing import IO
+
+from pydantic import ValidationError
+
+from app.api.export import ExportFormat
+from app.models import ItemCreate, ItemImportError, ItemsImportChunk
+
+# Rows validated and sent in one COPY, then committed
+IMPORT_CHUNK_SIZE = 10000
+
+# Invalid rows reported per chunk, the rest are only counted as failed
+MAX_IMPORT_ERRORS = 100
+
+
+def _decode_lines(file: IO[bytes]) -> Iterator[str | ValueError]:
+    # Line by line, so a bad byte only fails its own row
+    for raw in file:
+        try:
+            yield raw.decode("utf-8")
+        except UnicodeDecodeError:
+            yield ValueError("row: not valid UTF-8")
+
+
+def _read_csv_rows(
+    file: IO[bytes],
+) -> Iterator[tuple[int, dict[str, str] | ValueError]]:
+    unreadable: list[tuple[int, ValueError]] = []
+
+    def lines() -> Iterator[str]:
+        for line, text in enumerate(_decode_lines(file), 1):
+            if isinstance(text, ValueError):
+                unreadable.append((line, text))
+                # A blank line, which the reader skips
+                text = "\n"
+            yield text
+
+    reader = csv.DictReader(lines())
+    while True:
+        row: dict[str, str] | ValueError | None
+        try:
+            row = next(reader, None)
+        except csv.Error as e:
+            row = ValueError(f"row: {e}")
+        yield from unreadable
+        unreadable.clear()
+        if row is None:
+            return
+        # DictReader.line_num isn't updated when a row fails
+        yield reader.reader.line_num, row
+
+
+def _read_rows(
+    file: IO[bytes], format: ExportFormat
+) -> Iterator[tuple[int, str | dict[str, str] | ValueError]]:
+    """
+    The rows of the upload with their line number. Rows that can't be read,
+    not valid UTF-8 or malformed CSV, are a ValueError describing why.
+    """
+    if format == "csv":
+        yield from _read_csv_rows(file)
+        return
+    for line, data in enumerate(_decode_lines(file), 1):
+        if isinstance(data, ValueError) or data.strip():
+            yield line, data
+
+
+def _validate(data: str | dict[str, str]) -> ItemCreate:
+    if isinstance(data, str):
+        return ItemCreate.model_validate_json(data)
+    # Empty CSV cells are missing values, as written by /items/export
+    return ItemCreate.model_validate({k: v for k, v in data.items() if v})
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, e['loc'])) or 'row'}: {e['msg']}" for e in error.errors()
+    )
+
+
+def read_item_chunks(
+    file: IO[bytes], format: ExportFormat, chunk_size: int = IMPORT_CHUNK_SIZE
+) -> Iterator[tuple[list[ItemCreate], ItemsImportChunk]]:
+    """
+    Read and validate the rows of an upload one chunk at a time, so only one
+    chunk is held in memory. Extra columns, like the ids of an export, are
+    ignored.
+    """
+    items: list[ItemCreate] = []
+    chunk: ItemsImportChunk | None = None
+    for line, data in _read_rows(file, format):
+        if chunk is None:
+            chunk = ItemsImportChunk(first_line=line)
+        chunk.rows += 1
+        error = None
+        if isinstance(data, ValueError):
+            error = str(data)
+        else:
+            try:
+                items.append(_validate(data))
+            except ValidationError as e:
+                error = _describe(e)
+        if error and len(chunk.errors) < MAX_IMPORT_ERRORS:
+            chunk.errors.append(ItemImportError(line=line, error=error))
+        if chunk.rows == chunk_size:
+            yield items, chunk
+            items, chunk = [], None
+    if chunk is not None:
+        yield items, chunk
@@ -1,13 +1,16 @@
 from fastapi import APIRouter
 
-from app.api.routes import items, login, private, users, utils
+from app.api.routes import items, items_async, login, private, users, utils
 from app.core.config import settings
 
 api_router = APIRouter()
 api_router.include_router(login.router)
 api_router.include_router(users.router)
 api_router.include_router(utils.router)
-api_router.include_router(items.router)
+if settings.DB_ASYNC:
+    api_router.include_router(items_async.router)
+else:
+    api_router.include_router(items.router)
 
 
 if settings.ENVIRONMENT == "local":
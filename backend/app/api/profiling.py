@@ -0,0 +1,175 @@
+import functools
+import inspect
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+from pyinstrument import Profiler
+from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+from pyinstrument.session import Session as ProfilerSession
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.deps import get_current_active_superuser, get_current_user, reusable_oauth2
+from app.core.config import settings
+from app.core.db import engine
+
+# Superusers sending it get the profile of the request instead of its response
+PROFILE_HEADER = b"x-profile"
+# Header values, speedscope files open in https://www.speedscope.app
+FORMATS = {
+    "speedscope": (SpeedscopeRenderer, "application/json", "speedscope.json"),
+    "html": (HTMLRenderer, "text/html", "html"),
+}
+
+
+class RequestProfile:
+    """
+    Profiler sessions of the threads that served a request.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.sessions: list[ProfilerSession] = []
+
+    def add(self, session: ProfilerSession | None) -> None:
+        if session:
+            with self._lock:
+                self.sessions.append(session)
+
+    @contextmanager
+    def profile_thread(self) -> Iterator[None]:
+        # pyinstrument samples the thread it's started in
+        profiler = Profiler(interval=settings.PROFILING_INTERVAL, async_mode="disabled")
+        profiler.start()
+        try:
+            yield
+        finally:
+            self.add(profiler.stop())
+
+    def session(self) -> ProfilerSession:
+        return functools.reduce(ProfilerSession.combine, self.sessions)
+
+
+# Set by ProfilingMiddleware for the requests it profiles, the threadpool runs
+# with a copy of the request context so ProfiledRoute can find it
+current_profile: ContextVar[RequestProfile | None] = ContextVar(
+    "current_profile", default=None
+)
+
+
+def profiled(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    # Including a router builds its routes again from their endpoints, which
+    # are then already wrapped
+    if getattr(endpoint, "__profiled__", False):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        profile = current_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        with profile.profile_thread():
+            return endpoint(*args, **kwargs)
+
+    wrapper.__profiled__ = True  # type: ignore[attr-defined]
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Route whose sync endpoint is also profiled in the threadpool thread that
+    runs it, the event loop profile only shows the time waiting for it.
+
+    Sync dependencies, like get_db, get_read_db and get_current_user, run in
+    the threadpool too but aren't profiled there: the profile only shows the
+    time the event loop waited for them.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        # FastAPI sends the endpoints that aren't coroutine functions to the
+        # threadpool
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def authorize(token: str) -> None:
+    with Session(engine) as session:
+        get_current_active_superuser(get_current_user(session, token))
+
+
+class ProfilingMiddleware:
+    """
+    Profile the requests of superusers that send the X-Profile header, with
+    "speedscope" or "html" as value, and respond with the profile. Other
+    requests go straight through, no profiler runs.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        value = next((v for k, v in scope["headers"] if k == PROFILE_HEADER), None)
+        if value is None:
+            await self.app(scope, receive, send)
+            return
+
+        output = value.decode()
+        try:
+            if output not in FORMATS:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"X-Profile must be one of {', '.join(FORMATS)}",
+                )
+            # Raises a 401 instead of returning None without a token
+            token = await reusable_oauth2(Request(scope))
+            await run_in_threadpool(authorize, str(token))
+        except HTTPException as e:
+            error = JSONResponse(
+                {"detail": e.detail}, status_code=e.status_code, headers=e.headers
+            )
+            await error(scope, receive, send)
+            return
+        response = await self.profile(scope, receive, output)
+        await response(scope, receive, send)
+
+    async def profile(self, scope: Scope, receive: Receive, output: str) -> Response:
+        status = 500
+
+        async def discard(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        profiler = Profiler(interval=settings.PROFILING_INTERVAL, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profile.add(profiler.stop())
+            current_profile.reset(token)
+
+        renderer, media_type, extension = FORMATS[output]
+        route = scope.get("route")
+        name = route.unique_id if isinstance(route, APIRoute) else "request"
+        return Response(
+            renderer().render(profile.session()),
+            media_type=media_type,
+            headers={
+                "Content-Disposition": f'attachment; filename="{name}.{extension}"',
+                "X-Profiled-Status": str(status),
+            },
+        )
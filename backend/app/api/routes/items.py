@@ -1,48 +1,415 @@
+import time
 import uuid
-from typing import Any
+from collections.abc import Callable, Sequence
+from datetime import datetime
+from typing import Annotated, Any, Literal
 
-from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select
+import psycopg
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile
+from sqlalchemy import REAL, and_
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlmodel import cast, col, func, select, tuple_
 
-from app.api.deps import CurrentUser, SessionDep
-from app.models import Item, ItemCreate, ItemPublic, ItemsPublic, ItemUpdate, Message
+from app import crud
+from app.api.deps import CurrentUser, ReadSessionDep, SessionDep
+from app.api.etags import not_modified, page_etag, row_etag
+from app.api.export import ExportFormat, export_response, export_rows
+from app.api.imports import read_item_chunks
+from app.api.pagination import (
+    decode_cursor,
+    encode_cursor,
+    page_response,
+    public_columns,
+)
+from app.api.profiling import ProfiledRoute
+from app.core.config import settings
+from app.models import (
+    ITEM_SEARCH_CONFIG,
+    Item,
+    ItemBulkResult,
+    ItemCreate,
+    ItemImportError,
+    ItemPublic,
+    ItemsBulkCreate,
+    ItemsBulkDelete,
+    ItemsBulkResults,
+    ItemsBulkUpdate,
+    ItemsFilter,
+    ItemsImportResult,
+    ItemSort,
+    ItemsPublic,
+    ItemUpdate,
+    Message,
+    User,
+)
 
-router = APIRouter(prefix="/items", tags=["items"])
+router = APIRouter(prefix="/items", tags=["items"], route_class=ProfiledRoute)
+
+
+def sort_column(name: str) -> Any:
+    column = col(getattr(Item, name))
+    # As in the title indexes
+    return column.collate("C") if name == "title" else column
+
+
+def prefix_condition(column: Any, prefix: str) -> Any:
+    """
+    Bytewise, the strings starting with `prefix` are the range from `prefix`
+    up to `prefix` with its last character incremented.
+    """
+    last = ord(prefix[-1]) + 1
+    if 0xD800 <= last <= 0xDFFF or last > 0x10FFFF:
+        # Not a character, keep the lower bound only
+        return and_(column >= prefix, column.startswith(prefix, autoescape=True))
+    return and_(column >= prefix, column < prefix[:-1] + chr(last))
+
+
+def decode_items_cursor(cursor: str, sort: ItemSort | None) -> tuple[Any, uuid.UUID]:
+    """
+    The sort key and id in a cursor of `items_cursor`, made for the same `sort`.
+    """
+    name = sort.removeprefix("-") if sort else None
+    parse: Callable[[str], Any] = uuid.UUID
+    if name == "title":
+        parse = str
+    elif name:
+        parse = datetime.fromisoformat
+    cursor_sort, value, item_id = decode_cursor(cursor, str, parse, uuid.UUID)
+    # The key of another sort may parse as well, and give the wrong page
+    if cursor_sort != (sort or ""):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, item_id
+
+
+def items_statement(
+    current_user: User,
+    filters: ItemsFilter,
+    sort: ItemSort | None,
+    skip: int,
+    limit: int,
+    cursor: str | None,
+) -> Any:
+    """
+    A page of the items of `current_user`, or of all items for superusers.
+    Each sort order walks its own index, in (owner_id, id) order by default.
+    """
+    columns = public_columns(Item, ItemPublic, "updated_at", "created_at")
+    statement = select(*columns).limit(limit)
+    # Within a single owner, the keys lead with owner_id so the planner walks
+    # the ix_item_owner_id_* index of the sort instead of filtering the global one
+    owner = filters.owner_id if current_user.is_superuser else current_user.id
+    if sort is None:
+        statement = statement.order_by(col(Item.owner_id), col(Item.id))
+        if cursor:
+            owner_id, item_id = decode_items_cursor(cursor, sort)
+            statement = statement.where(
+                tuple_(col(Item.owner_id), col(Item.id)) > tuple_(owner_id, item_id)
+            )
+    else:
+        name = sort.removeprefix("-")
+        column = sort_column(name)
+        if sort.startswith("-"):
+            statement = statement.order_by(column.desc(), col(Item.id).desc())
+        else:
+            statement = statement.order_by(column, col(Item.id))
+        if cursor:
+            value, item_id = decode_items_cursor(cursor, sort)
+            keys, values = [column, col(Item.id)], [value, item_id]
+            if owner:
+                keys, values = [col(Item.owner_id), *keys], [owner, *values]
+            key, last = tuple_(*keys), tuple_(*values)
+            statement = statement.where(
+                key < last if sort.startswith("-") else key > last
+            )
+    if not cursor:
+        statement = statement.offset(skip)
+
+    if not current_user.is_superuser:
+        statement = statement.where(Item.owner_id == current_user.id)
+    if filters.owner_id:
+        statement = statement.where(Item.owner_id == filters.owner_id)
+    if filters.title_prefix:
+        statement = statement.where(
+            prefix_condition(sort_column("title"), filters.title_prefix)
+        )
+    for name, after, before in [
+        ("created_at", filters.created_after, filters.created_before),
+        ("updated_at", filters.updated_after, filters.updated_before),
+    ]:
+        if after:
+            statement = statement.where(col(getattr(Item, name)) > after)
+        if before:
+            statement = statement.where(col(getattr(Item, name)) < before)
+    return statement
+
+
+def items_cursor(items: Sequence[Any], sort: ItemSort | None, limit: int) -> str | None:
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    if sort is None:
+        return encode_cursor("", last.owner_id, last.id)
+    return encode_cursor(sort, getattr(last, sort.removeprefix("-")), last.id)
+
+
+def items_counter(current_user: User, filters: ItemsFilter) -> str | None:
+    """
+    The counter of the items listed, None when they are filtered.
+    """
+    if filters.model_dump(exclude_none=True):
+        return None
+    if current_user.is_superuser:
+        return crud.ITEM_COUNTER
+    return crud.owner_item_counter(current_user.id)
 
 
 @router.get("/", response_model=ItemsPublic)
 def read_items(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    request: Request,
+    response: Response,
+    session: ReadSessionDep,
+    current_user: CurrentUser,
+    filters: Annotated[ItemsFilter, Depends()],
+    sort: ItemSort | None = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    include_count: bool = True,
 ) -> Any:
     """
     Retrieve items.
+
+    Pass the `next_cursor` of the previous page as `cursor` to page by key
+    instead of by offset, with the same `sort` and filters. `count` is null
+    when filtering, only superusers can list the items of another `owner_id`.
     """
+    counter = items_counter(current_user, filters)
+    count = None
+    if include_count and counter:
+        count = crud.get_counter(session=session, name=counter)
+    statement = items_statement(current_user, filters, sort, skip, limit, cursor)
+    items = session.exec(statement).all()
 
-    if current_user.is_superuser:
-        count_statement = select(func.count()).select_from(Item)
-        count = session.exec(count_statement).one()
-        statement = select(Item).offset(skip).limit(limit)
-        items = session.exec(statement).all()
-    else:
-        count_statement = (
-            select(func.count())
-            .select_from(Item)
-            .where(Item.owner_id == current_user.id)
+    next_cursor = items_cursor(items, sort, limit)
+    etag = page_etag(items, count, next_cursor)
+    if unchanged := not_modified(request, response, etag):
+        return unchanged
+    if settings.FAST_LIST_RESPONSES:
+        return page_response(
+            items,
+            ItemPublic,
+            count=count,
+            next_cursor=next_cursor,
+            headers=response.headers,
         )
-        count = session.exec(count_statement).one()
-        statement = (
-            select(Item)
-            .where(Item.owner_id == current_user.id)
-            .offset(skip)
-            .limit(limit)
+    return ItemsPublic(data=items, count=count, next_cursor=next_cursor)
+
+
+def bulk_results(
+    ids: Sequence[uuid.UUID],
+    status: Literal["created", "updated", "deleted"],
+    items: Sequence[Item] = (),
+    found: Sequence[uuid.UUID] = (),
+) -> ItemsBulkResults:
+    """
+    One result per requested id, in request order. Ids that weren't found, or
+    that belong to another user, are reported as `not_found`.
+    """
+    by_id = {item.id: item for item in items}
+    found_ids = set(found) | by_id.keys()
+    return ItemsBulkResults(
+        data=[
+            ItemBulkResult(
+                id=id,
+                status=status if id in found_ids else "not_found",
+                item=by_id.get(id),
+            )
+            for id in ids
+        ]
+    )
+
+
+def check_unique_ids(ids: Sequence[uuid.UUID]) -> None:
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Duplicate item ids")
+
+
+def export_statement(current_user: User) -> Any:
+    statement = select(*public_columns(Item, ItemPublic)).order_by(col(Item.id))
+    if not current_user.is_superuser:
+        statement = statement.where(Item.owner_id == current_user.id)
+    return statement
+
+
+def search_statement(current_user: User, q: str, limit: int, cursor: str | None) -> Any:
+    """
+    The items matching `q`, best ranked first, with their rank. Walks the GIN
+    index on `Item.search_vector`, only the matching rows are ranked.
+
+    At most ITEM_SEARCH_MAX_RANKED matches are ranked, the first ones by id
+    among the items the user can see. It's the same sample on every page, so
+    the cursor neither skips nor repeats items.
+    """
+    query = func.websearch_to_tsquery(cast(ITEM_SEARCH_CONFIG, REGCONFIG), q)
+    columns = public_columns(Item, ItemPublic, "updated_at")
+    matches = select(*public_columns(Item, ItemPublic, "updated_at", "search_vector"))
+    matches = matches.where(col(Item.search_vector).bool_op("@@")(query))
+    if not current_user.is_superuser:
+        matches = matches.where(Item.owner_id == current_user.id)
+    if settings.ITEM_SEARCH_MAX_RANKED:
+        matches = matches.order_by(col(Item.id)).limit(settings.ITEM_SEARCH_MAX_RANKED)
+    found = matches.subquery("matches")
+    # Ranked outside of the subquery, only for the rows it keeps
+    rank = func.ts_rank(found.c.search_vector, query)
+    ranked = [*[found.c[column.key] for column in columns], rank.label("rank")]
+    statement = select(*ranked).order_by(rank.desc(), found.c.id.desc()).limit(limit)
+    if cursor:
+        last_rank, item_id = decode_cursor(cursor, float, uuid.UUID)
+        # The rank is a real, compared as a double it wouldn't equal itself
+        statement = statement.where(
+            tuple_(rank, found.c.id) < tuple_(cast(last_rank, REAL), item_id)
         )
-        items = session.exec(statement).all()
+    return statement
+
+
+def search_cursor(items: Sequence[Any], limit: int) -> str | None:
+    if items and len(items) == limit:
+        return encode_cursor(items[-1].rank, items[-1].id)
+    return None
 
-    return ItemsPublic(data=items, count=count)
+
+# The export, search and bulk routes come before "/{id}", which would also match
+# them
+
+
+@router.get("/export")
+def export_items(current_user: CurrentUser, format: ExportFormat = "ndjson") -> Any:
+    """
+    Stream all the items as NDJSON or CSV.
+    """
+    content = export_rows(export_statement(current_user), ItemPublic, format)
+    return export_response(content, "items", format)
+
+
+@router.get("/search", response_model=ItemsPublic)
+def search_items(
+    request: Request,
+    response: Response,
+    session: ReadSessionDep,
+    current_user: CurrentUser,
+    q: str,
+    limit: int = 100,
+    cursor: str | None = None,
+) -> Any:
+    """
+    Search the titles and descriptions of the items, best matches first.
+
+    `q` uses the web search syntax: `"quoted phrases"`, `or` and `-excluded`
+    words. Pass the `next_cursor` of the previous page as `cursor` to get the
+    next one, `count` is always null.
+    """
+    items = session.exec(search_statement(current_user, q, limit, cursor)).all()
+    next_cursor = search_cursor(items, limit)
+    if unchanged := not_modified(request, response, page_etag(items, next_cursor)):
+        return unchanged
+    if settings.FAST_LIST_RESPONSES:
+        return page_response(
+            items,
+            ItemPublic,
+            count=None,
+            next_cursor=next_cursor,
+            headers=response.headers,
+        )
+    return ItemsPublic(data=items, count=None, next_cursor=next_cursor)
+
+
+@router.post("/bulk", response_model=ItemsBulkResults)
+def create_items(
+    *, session: SessionDep, current_user: CurrentUser, items_in: ItemsBulkCreate
+) -> Any:
+    """
+    Create many items in one transaction.
+    """
+    items = crud.create_items(
+        session=session, items_in=items_in.data, owner_id=current_user.id
+    )
+    return bulk_results([item.id for item in items], "created", items)
+
+
+@router.patch("/bulk", response_model=ItemsBulkResults)
+def update_items(
+    *, session: SessionDep, current_user: CurrentUser, items_in: ItemsBulkUpdate
+) -> Any:
+    """
+    Update many items in one transaction, each row only changes the fields it
+    sets.
+    """
+    ids = [item_in.id for item_in in items_in.data]
+    check_unique_ids(ids)
+    owner_id = None if current_user.is_superuser else current_user.id
+    items = crud.update_items(
+        session=session, items_in=items_in.data, owner_id=owner_id
+    )
+    return bulk_results(ids, "updated", items)
+
+
+@router.delete("/bulk", response_model=ItemsBulkResults)
+def delete_items(
+    *, session: SessionDep, current_user: CurrentUser, items_in: ItemsBulkDelete
+) -> Any:
+    """
+    Delete many items in one transaction.
+    """
+    owner_id = None if current_user.is_superuser else current_user.id
+    deleted = crud.delete_items(session=session, ids=items_in.ids, owner_id=owner_id)
+    return bulk_results(items_in.ids, "deleted", found=deleted)
+
+
+@router.post("/import", response_model=ItemsImportResult)
+def import_items(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    file: UploadFile,
+    format: ExportFormat = "ndjson",
+) -> Any:
+    """
+    Import items from an NDJSON or CSV file, with the columns of `ItemCreate`.
+
+    Rows are loaded with COPY in chunks, each committed on its own. Invalid
+    rows are skipped and reported with their line number, a chunk that fails
+    to load is reported on its first line.
+    """
+    started = time.perf_counter()
+    chunks = []
+    for items_in, chunk in read_item_chunks(file.file, format):
+        try:
+            chunk.imported = crud.copy_items(
+                session=session, items_in=items_in, owner_id=current_user.id
+            )
+        except psycopg.Error as e:
+            session.rollback()
+            error = f"Chunk not imported: {e}"
+            chunk.errors.insert(0, ItemImportError(line=chunk.first_line, error=error))
+        chunks.append(chunk)
+    elapsed = time.perf_counter() - started
+    imported = sum(chunk.imported for chunk in chunks)
+    return ItemsImportResult(
+        data=chunks,
+        imported=imported,
+        failed=sum(chunk.rows for chunk in chunks) - imported,
+        rows_per_second=round(imported / elapsed, 1) if elapsed else 0.0,
+    )
 
 
 @router.get("/{id}", response_model=ItemPublic)
-def read_item(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) -> Any:
+def read_item(
+    request: Request,
+    response: Response,
+    session: ReadSessionDep,
+    current_user: CurrentUser,
+    id: uuid.UUID,
+) -> Any:
     """
     Get item by ID.
     """
@@ -51,6 +418,8 @@ def read_item(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) ->
         raise HTTPException(status_code=404, detail="Item not found")
     if not current_user.is_superuser and (item.owner_id != current_user.id):
         raise HTTPException(status_code=400, detail="Not enough permissions")
+    if unchanged := not_modified(request, response, row_etag(item)):
+        return unchanged
     return item
 
 
@@ -61,10 +430,7 @@ def create_item(
     """
     Create new item.
     """
-    item = Item.model_validate(item_in, update={"owner_id": current_user.id})
-    session.add(item)
-    session.commit()
-    session.refresh(item)
+    item = crud.create_item(session=session, item_in=item_in, owner_id=current_user.id)
     return item
 
 
@@ -79,16 +445,15 @@ def update_item(
     """
     Update an item.
     """
-    item = session.get(Item, id)
+    owner_id = None if current_user.is_superuser else current_user.id
+    item = crud.update_item(
+        session=session, item_id=id, item_in=item_in, owner_id=owner_id
+    )
     if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    if not current_user.is_superuser and (item.owner_id != current_user.id):
+        # Only failed updates pay for telling a missing item from another's
+        if not session.get(Item, id):
+            raise HTTPException(status_code=404, detail="Item not found")
         raise HTTPException(status_code=400, detail="Not enough permissions")
-    update_dict = item_in.model_dump(exclude_unset=True)
-    item.sqlmodel_update(update_dict)
-    session.add(item)
-    session.commit()
-    session.refresh(item)
     return item
 
 
@@ -104,6 +469,5 @@ def delete_item(
         raise HTTPException(status_code=404, detail="Item not found")
     if not current_user.is_superuser and (item.owner_id != current_user.id):
         raise HTTPException(status_code=400, detail="Not enough permissions")
-    session.delete(item)
-    session.commit()
+    crud.delete_item(session=session, db_item=item)
     return Message(message="Item deleted successfully")
@@ -0,0 +1,265 @@
+import uuid
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+
+from app import crud_async
+from app.api.deps import AsyncCurrentUser, AsyncReadSessionDep, AsyncSessionDep
+from app.api.etags import not_modified, page_etag, row_etag
+from app.api.export import ExportFormat, export_response, export_rows_async
+from app.api.pagination import page_response
+from app.api.profiling import ProfiledRoute
+from app.api.routes.items import (
+    bulk_results,
+    check_unique_ids,
+    export_statement,
+    import_items,
+    items_counter,
+    items_cursor,
+    items_statement,
+    search_cursor,
+    search_statement,
+)
+from app.core.config import settings
+from app.models import (
+    Item,
+    ItemCreate,
+    ItemPublic,
+    ItemsBulkCreate,
+    ItemsBulkDelete,
+    ItemsBulkResults,
+    ItemsBulkUpdate,
+    ItemsFilter,
+    ItemsImportResult,
+    ItemSort,
+    ItemsPublic,
+    ItemUpdate,
+    Message,
+)
+
+# Async versions of the routes in app.api.routes.items, mounted in their place
+# when settings.DB_ASYNC is enabled.
+
+router = APIRouter(prefix="/items", tags=["items"], route_class=ProfiledRoute)
+
+
+@router.get("/", response_model=ItemsPublic)
+async def read_items(
+    request: Request,
+    response: Response,
+    session: AsyncReadSessionDep,
+    current_user: AsyncCurrentUser,
+    filters: Annotated[ItemsFilter, Depends()],
+    sort: ItemSort | None = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    include_count: bool = True,
+) -> Any:
+    """
+    Retrieve items.
+
+    Pass the `next_cursor` of the previous page as `cursor` to page by key
+    instead of by offset, with the same `sort` and filters. `count` is null
+    when filtering, only superusers can list the items of another `owner_id`.
+    """
+    counter = items_counter(current_user, filters)
+    count = None
+    if include_count and counter:
+        count = await crud_async.get_counter(session=session, name=counter)
+    statement = items_statement(current_user, filters, sort, skip, limit, cursor)
+    items = (await session.exec(statement)).all()
+
+    next_cursor = items_cursor(items, sort, limit)
+    etag = page_etag(items, count, next_cursor)
+    if unchanged := not_modified(request, response, etag):
+        return unchanged
+    if settings.FAST_LIST_RESPONSES:
+        return page_response(
+            items,
+            ItemPublic,
+            count=count,
+            next_cursor=next_cursor,
+            headers=response.headers,
+        )
+    return ItemsPublic(data=items, count=count, next_cursor=next_cursor)
+
+
+@router.get("/export")
+async def export_items(
+    current_user: AsyncCurrentUser, format: ExportFormat = "ndjson"
+) -> Any:
+    """
+    Stream all the items as NDJSON or CSV.
+    """
+    content = export_rows_async(export_statement(current_user), ItemPublic, format)
+    return export_response(content, "items", format)
+
+
+@router.get("/search", response_model=ItemsPublic)
+async def search_items(
+    request: Request,
+    response: Response,
+    session: AsyncReadSessionDep,
+    current_user: AsyncCurrentUser,
+    q: str,
+    limit: int = 100,
+    cursor: str | None = None,
+) -> Any:
+    """
+    Search the titles and descriptions of the items, best matches first.
+
+    `q` uses the web search syntax: `"quoted phrases"`, `or` and `-excluded`
+    words. Pass the `next_cursor` of the previous page as `cursor` to get the
+    next one, `count` is always null.
+    """
+    statement = search_statement(current_user, q, limit, cursor)
+    items = (await session.exec(statement)).all()
+    next_cursor = search_cursor(items, limit)
+    if unchanged := not_modified(request, response, page_etag(items, next_cursor)):
+        return unchanged
+    if settings.FAST_LIST_RESPONSES:
+        return page_response(
+            items,
+            ItemPublic,
+            count=None,
+            next_cursor=next_cursor,
+            headers=response.headers,
+        )
+    return ItemsPublic(data=items, count=None, next_cursor=next_cursor)
+
+
+@router.post("/bulk", response_model=ItemsBulkResults)
+async def create_items(
+    *,
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
+    items_in: ItemsBulkCreate,
+) -> Any:
+    """
+    Create many items in one transaction.
+    """
+    items = await crud_async.create_items(
+        session=session, items_in=items_in.data, owner_id=current_user.id
+    )
+    return bulk_results([item.id for item in items], "created", items)
+
+
+@router.patch("/bulk", response_model=ItemsBulkResults)
+async def update_items(
+    *,
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
+    items_in: ItemsBulkUpdate,
+) -> Any:
+    """
+    Update many items in one transaction, each row only changes the fields it
+    sets.
+    """
+    ids = [item_in.id for item_in in items_in.data]
+    check_unique_ids(ids)
+    owner_id = None if current_user.is_superuser else current_user.id
+    items = await crud_async.update_items(
+        session=session, items_in=items_in.data, owner_id=owner_id
+    )
+    return bulk_results(ids, "updated", items)
+
+
+@router.delete("/bulk", response_model=ItemsBulkResults)
+async def delete_items(
+    *,
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
+    items_in: ItemsBulkDelete,
+) -> Any:
+    """
+    Delete many items in one transaction.
+    """
+    owner_id = None if current_user.is_superuser else current_user.id
+    deleted = await crud_async.delete_items(
+        session=session, ids=items_in.ids, owner_id=owner_id
+    )
+    return bulk_results(items_in.ids, "deleted", found=deleted)
+
+
+# Parsing and validating the rows is CPU bound, the sync route runs in the
+# threadpool instead of blocking the event loop
+router.add_api_route(
+    "/import",
+    import_items,
+    methods=["POST"],
+    response_model=ItemsImportResult,
+)
+
+
+@router.get("/{id}", response_model=ItemPublic)
+async def read_item(
+    request: Request,
+    response: Response,
+    session: AsyncReadSessionDep,
+    current_user: AsyncCurrentUser,
+    id: uuid.UUID,
+) -> Any:
+    """
+    Get item by ID.
+    """
+    item = await session.get(Item, id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    if not current_user.is_superuser and (item.owner_id != current_user.id):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    if unchanged := not_modified(request, response, row_etag(item)):
+        return unchanged
+    return item
+
+
+@router.post("/", response_model=ItemPublic)
+async def create_item(
+    *, session: AsyncSessionDep, current_user: AsyncCurrentUser, item_in: ItemCreate
+) -> Any:
+    """
+    Create new item.
+    """
+    item = await crud_async.create_item(
+        session=session, item_in=item_in, owner_id=current_user.id
+    )
+    return item
+
+
+@router.put("/{id}", response_model=ItemPublic)
+async def update_item(
+    *,
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
+    id: uuid.UUID,
+    item_in: ItemUpdate,
+) -> Any:
+    """
+    Update an item.
+    """
+    owner_id = None if current_user.is_superuser else current_user.id
+    item = await crud_async.update_item(
+        session=session, item_id=id, item_in=item_in, owner_id=owner_id
+    )
+    if not item:
+        # Only failed updates pay for telling a missing item from another's
+        if not await session.get(Item, id):
+            raise HTTPException(status_code=404, detail="Item not found")
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    return item
+
+
+@router.delete("/{id}")
+async def delete_item(
+    session: AsyncSessionDep, current_user: AsyncCurrentUser, id: uuid.UUID
+) -> Message:
+    """
+    Delete an item.
+    """
+    item = await session.get(Item, id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    if not current_user.is_superuser and (item.owner_id != current_user.id):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    await crud_async.delete_item(session=session, db_item=item)
+    return Message(message="Item deleted successfully")
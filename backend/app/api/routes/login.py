@@ -7,18 +7,20 @@ from fastapi.security import OAuth2PasswordRequestForm
 
 from app import crud
 from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
+from app.api.profiling import ProfiledRoute
 from app.core import security
+from app.core.cache import invalidate_user
 from app.core.config import settings
 from app.core.security import get_password_hash
 from app.models import Message, NewPassword, Token, UserPublic
 from app.utils import (
     generate_password_reset_token,
     generate_reset_password_email,
-    send_email,
+    queue_email,
     verify_password_reset_token,
 )
 
-router = APIRouter(tags=["login"])
+router = APIRouter(tags=["login"], route_class=ProfiledRoute)
 
 
 @router.post("/login/access-token")
@@ -67,7 +69,8 @@ def recover_password(email: str, session: SessionDep) -> Message:
     email_data = generate_reset_password_email(
         email_to=user.email, email=email, token=password_reset_token
     )
-    send_email(
+    queue_email(
+        session=session,
         email_to=user.email,
         subject=email_data.subject,
         html_content=email_data.html_content,
@@ -94,6 +97,7 @@ def reset_password(session: SessionDep, body: NewPassword) -> Message:
     hashed_password = get_password_hash(password=body.new_password)
     user.hashed_password = hashed_password
     session.add(user)
+    invalidate_user(session=session, user_id=user.id)
     session.commit()
     return Message(message="Password updated successfully")
 
@@ -3,14 +3,16 @@ from typing import Any
 from fastapi import APIRouter
 from pydantic import BaseModel
 
+from app import crud
 from app.api.deps import SessionDep
+from app.api.profiling import ProfiledRoute
 from app.core.security import get_password_hash
 from app.models import (
     User,
     UserPublic,
 )
 
-router = APIRouter(tags=["private"], prefix="/private")
+router = APIRouter(tags=["private"], prefix="/private", route_class=ProfiledRoute)
 
 
 class PrivateUserCreate(BaseModel):
@@ -33,6 +35,7 @@ def create_user(user_in: PrivateUserCreate, session: SessionDep) -> Any:
     )
 
     session.add(user)
+    crud.increment_counter(session=session, name=crud.USER_COUNTER)
     session.commit()
 
     return user
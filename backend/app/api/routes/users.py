@@ -1,19 +1,29 @@
 import uuid
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import col, delete, func, select
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlmodel import col, select
 
 from app import crud
 from app.api.deps import (
     CurrentUser,
+    ReadSessionDep,
     SessionDep,
     get_current_active_superuser,
 )
+from app.api.etags import not_modified, page_etag, row_etag
+from app.api.export import ExportFormat, export_response, export_rows
+from app.api.pagination import (
+    decode_cursor,
+    encode_cursor,
+    page_response,
+    public_columns,
+)
+from app.api.profiling import ProfiledRoute
+from app.core.cache import invalidate_user
 from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
 from app.models import (
-    Item,
     Message,
     UpdatePassword,
     User,
@@ -24,9 +34,9 @@ from app.models import (
     UserUpdate,
     UserUpdateMe,
 )
-from app.utils import generate_new_account_email, send_email
+from app.utils import generate_new_account_email, queue_email
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=ProfiledRoute)
 
 
 @router.get(
@@ -34,18 +44,63 @@ router = APIRouter(prefix="/users", tags=["users"])
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UsersPublic,
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+def read_users(
+    request: Request,
+    response: Response,
+    session: ReadSessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    include_count: bool = True,
+) -> Any:
     """
     Retrieve users.
+
+    Pass the `next_cursor` of the previous page as `cursor` to page by key
+    instead of by offset.
     """
 
-    count_statement = select(func.count()).select_from(User)
-    count = session.exec(count_statement).one()
+    count = None
+    if include_count:
+        count = crud.get_counter(session=session, name=crud.USER_COUNTER)
 
-    statement = select(User).offset(skip).limit(limit)
+    statement = (
+        select(*public_columns(User, UserPublic, "updated_at"))
+        .order_by(col(User.id))
+        .limit(limit)
+    )
+    if cursor:
+        (user_id,) = decode_cursor(cursor, uuid.UUID)
+        statement = statement.where(col(User.id) > user_id)
+    else:
+        statement = statement.offset(skip)
     users = session.exec(statement).all()
 
-    return UsersPublic(data=users, count=count)
+    next_cursor = None
+    if users and len(users) == limit:
+        next_cursor = encode_cursor(users[-1].id)
+    etag = page_etag(users, count, next_cursor)
+    if unchanged := not_modified(request, response, etag):
+        return unchanged
+    if settings.FAST_LIST_RESPONSES:
+        return page_response(
+            users,
+            UserPublic,
+            count=count,
+            next_cursor=next_cursor,
+            headers=response.headers,
+        )
+    return UsersPublic(data=users, count=count, next_cursor=next_cursor)
+
+
+@router.get("/export", dependencies=[Depends(get_current_active_superuser)])
+def export_users(format: ExportFormat = "ndjson") -> Any:
+    """
+    Stream all the users as NDJSON or CSV.
+    """
+    statement = select(*public_columns(User, UserPublic)).order_by(col(User.id))
+    content = export_rows(statement, UserPublic, format)
+    return export_response(content, "users", format)
 
 
 @router.post(
@@ -67,7 +122,8 @@ def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
         email_data = generate_new_account_email(
             email_to=user_in.email, username=user_in.email, password=user_in.password
         )
-        send_email(
+        queue_email(
+            session=session,
             email_to=user_in.email,
             subject=email_data.subject,
             html_content=email_data.html_content,
@@ -89,12 +145,8 @@ def update_user_me(
             raise HTTPException(
                 status_code=409, detail="User with this email already exists"
             )
-    user_data = user_in.model_dump(exclude_unset=True)
-    current_user.sqlmodel_update(user_data)
-    session.add(current_user)
-    session.commit()
-    session.refresh(current_user)
-    return current_user
+    user = crud.update_user(session=session, db_user=current_user, user_in=user_in)
+    return user
 
 
 @router.patch("/me/password", response_model=Message)
@@ -113,15 +165,20 @@ def update_password_me(
     hashed_password = get_password_hash(body.new_password)
     current_user.hashed_password = hashed_password
     session.add(current_user)
+    invalidate_user(session=session, user_id=current_user.id)
     session.commit()
     return Message(message="Password updated successfully")
 
 
 @router.get("/me", response_model=UserPublic)
-def read_user_me(current_user: CurrentUser) -> Any:
+def read_user_me(
+    request: Request, response: Response, current_user: CurrentUser
+) -> Any:
     """
     Get current user.
     """
+    if unchanged := not_modified(request, response, row_etag(current_user)):
+        return unchanged
     return current_user
 
 
@@ -129,13 +186,16 @@ def read_user_me(current_user: CurrentUser) -> Any:
 def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
     """
     Delete own user.
+
+    A user with more than USER_PURGE_INLINE_ITEMS items is deactivated right
+    away and deleted with their items in the background.
     """
     if current_user.is_superuser:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    session.delete(current_user)
-    session.commit()
+    if not crud.delete_user(session=session, db_user=current_user):
+        return Message(message="User deactivated, their items are being deleted")
     return Message(message="User deleted successfully")
 
 
@@ -157,19 +217,23 @@ def register_user(session: SessionDep, user_in: UserRegister) -> Any:
 
 @router.get("/{user_id}", response_model=UserPublic)
 def read_user_by_id(
-    user_id: uuid.UUID, session: SessionDep, current_user: CurrentUser
+    request: Request,
+    response: Response,
+    user_id: uuid.UUID,
+    session: ReadSessionDep,
+    current_user: CurrentUser,
 ) -> Any:
     """
     Get a specific user by id.
     """
-    user = session.get(User, user_id)
-    if user == current_user:
-        return user
-    if not current_user.is_superuser:
+    if user_id != current_user.id and not current_user.is_superuser:
         raise HTTPException(
             status_code=403,
             detail="The user doesn't have enough privileges",
         )
+    user = current_user if user_id == current_user.id else session.get(User, user_id)
+    if user and (unchanged := not_modified(request, response, row_etag(user))):
+        return unchanged
     return user
 
 
@@ -211,6 +275,9 @@ def delete_user(
 ) -> Message:
     """
     Delete a user.
+
+    A user with more than USER_PURGE_INLINE_ITEMS items is deactivated right
+    away and deleted with their items in the background.
     """
     user = session.get(User, user_id)
     if not user:
@@ -219,8 +286,6 @@ def delete_user(
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    statement = delete(Item).where(col(Item.owner_id) == user_id)
-    session.exec(statement)  # type: ignore
-    session.delete(user)
-    session.commit()
+    if not crud.delete_user(session=session, db_user=user):
+        return Message(message="User deactivated, their items are being deleted")
     return Message(message="User deleted successfully")
@@ -1,11 +1,16 @@
+from typing import Any
+
 from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
-from app.api.deps import get_current_active_superuser
+from app.api.deps import SessionDep, get_current_active_superuser
+from app.api.profiling import ProfiledRoute
+from app.core.cache import user_cache
+from app.core.db import pool_stats
 from app.models import Message
-from app.utils import generate_test_email, send_email
+from app.utils import generate_test_email, queue_email
 
-router = APIRouter(prefix="/utils", tags=["utils"])
+router = APIRouter(prefix="/utils", tags=["utils"], route_class=ProfiledRoute)
 
 
 @router.post(
@@ -13,12 +18,13 @@ router = APIRouter(prefix="/utils", tags=["utils"])
     dependencies=[Depends(get_current_active_superuser)],
     status_code=201,
 )
-def test_email(email_to: EmailStr) -> Message:
+def test_email(session: SessionDep, email_to: EmailStr) -> Message:
     """
-    Test emails.
+    Test emails, they are delivered by the email worker.
     """
     email_data = generate_test_email(email_to=email_to)
-    send_email(
+    queue_email(
+        session=session,
         email_to=email_to,
         subject=email_data.subject,
         html_content=email_data.html_content,
@@ -26,6 +32,28 @@ def test_email(email_to: EmailStr) -> Message:
     return Message(message="Test email sent")
 
 
+@router.get(
+    "/auth-cache/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def read_auth_cache_stats() -> dict[str, int]:
+    """
+    Hit and miss counters of the authenticated user cache in this worker.
+    """
+    return user_cache.stats()
+
+
+@router.get(
+    "/db-pool/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def read_db_pool_stats() -> dict[str, Any]:
+    """
+    Connection pool usage of the worker process serving this request.
+    """
+    return pool_stats()
+
+
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
@@ -0,0 +1,184 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Generic, TypeVar
+
+import psycopg
+from sqlalchemy import event, orm
+from sqlmodel import Session, func, select
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Thread safe LRU cache whose entries also expire after `ttl` seconds.
+
+    Read `version` before loading a value and pass it to `set`, the value is
+    then dropped if an entry was invalidated meanwhile: it may have been
+    loaded before the change that invalidated it.
+    """
+
+    def __init__(self, *, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.version = 0
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: K, value: V, *, version: int | None = None) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: K) -> None:
+        with self._lock:
+            self.version += 1
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
+
+
+# Column values of recently authenticated users but their password hash, keyed
+# by the token subject
+user_cache: TTLCache[str, dict[str, Any]] = TTLCache(
+    maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS
+)
+
+
+def invalidate_user(*, session: Session, user_id: uuid.UUID) -> None:
+    """
+    Evict a user from the auth cache once `session` commits.
+
+    With AUTH_CACHE_CHANNEL set, other workers are told through a NOTIFY that
+    Postgres only delivers if the transaction commits.
+    """
+    session.info.setdefault("invalidated_users", set()).add(str(user_id))
+    if settings.AUTH_CACHE_CHANNEL:
+        session.exec(select(func.pg_notify(settings.AUTH_CACHE_CHANNEL, str(user_id))))
+
+
+# Users that wrote in the last DB_REPLICA_READ_YOUR_WRITES_SECONDS, whose reads
+# skip the replicas so they see their own changes
+recent_writers: TTLCache[str, bool] = TTLCache(
+    maxsize=100_000, ttl=settings.DB_REPLICA_READ_YOUR_WRITES_SECONDS
+)
+
+# Payload prefix of the notifications about a user's writes
+WRITE_NOTIFICATION = "write:"
+
+
+def wrote_recently(user_id: uuid.UUID) -> bool:
+    return recent_writers.get(str(user_id)) is not None
+
+
+# Registered on the base class so it also covers AsyncSession.sync_session
+@event.listens_for(orm.Session, "after_commit")
+def _evict_invalidated_users(session: orm.Session) -> None:
+    for user_id in session.info.pop("invalidated_users", ()):
+        user_cache.invalidate(user_id)
+
+
+# The "user_id" of a session is the authenticated user of its request
+@event.listens_for(orm.Session, "before_commit")
+def _notify_user_write(session: orm.Session) -> None:
+    user_id = session.info.get("user_id")
+    if user_id and settings.SQLALCHEMY_REPLICA_URIS and settings.AUTH_CACHE_CHANNEL:
+        payload = f"{WRITE_NOTIFICATION}{user_id}"
+        session.connection().execute(
+            select(func.pg_notify(settings.AUTH_CACHE_CHANNEL, payload))
+        )
+
+
+@event.listens_for(orm.Session, "after_commit")
+def _record_user_write(session: orm.Session) -> None:
+    user_id = session.info.get("user_id")
+    if user_id and settings.SQLALCHEMY_REPLICA_URIS:
+        recent_writers.set(str(user_id), True)
+
+
+def _handle_notification(payload: str) -> None:
+    if payload.startswith(WRITE_NOTIFICATION):
+        recent_writers.set(payload.removeprefix(WRITE_NOTIFICATION), True)
+    else:
+        user_cache.invalidate(payload)
+
+
+class InvalidationListener(threading.Thread):
+    """
+    LISTEN on AUTH_CACHE_CHANNEL and evict the users other workers changed,
+    or record their writes for the replica routing.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(name="auth-cache-listener", daemon=True)
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                with psycopg.connect(
+                    host=settings.POSTGRES_SERVER,
+                    port=settings.POSTGRES_PORT,
+                    user=settings.POSTGRES_USER,
+                    password=settings.POSTGRES_PASSWORD,
+                    dbname=settings.POSTGRES_DB,
+                    autocommit=True,
+                ) as connection:
+                    connection.execute(
+                        psycopg.sql.SQL("LISTEN {}").format(
+                            psycopg.sql.Identifier(str(settings.AUTH_CACHE_CHANNEL))
+                        )
+                    )
+                    # Notifications may have been missed while disconnected
+                    user_cache.clear()
+                    while not self._stopped.is_set():
+                        for notify in connection.notifies(timeout=1.0):
+                            _handle_notification(notify.payload)
+            except psycopg.Error as e:
+                if not self._stopped.is_set():
+                    logger.warning(f"auth cache listener disconnected: {e}")
+                    user_cache.clear()
+                    self._stopped.wait(1)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join(timeout=5)
@@ -0,0 +1,200 @@
+import zlib
+from collections.abc import Callable, Sequence
+from typing import Protocol
+
+import brotli  # type: ignore[import-untyped]
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+}
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes:
+        """
+        Output everything compressed so far, so a streamed chunk can be sent.
+        """
+        ...
+
+    def finish(self) -> bytes: ...
+
+
+class GzipCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int) -> None:
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)  # type: ignore[no-any-return]
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()  # type: ignore[no-any-return]
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()  # type: ignore[no-any-return]
+
+
+class ZstdCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+# Content-Encoding names, with a compressor at the configured level
+COMPRESSORS: dict[str, Callable[[], Compressor]] = {
+    "zstd": lambda: ZstdCompressor(settings.COMPRESSION_ZSTD_LEVEL),
+    "br": lambda: BrotliCompressor(settings.COMPRESSION_BROTLI_QUALITY),
+    "gzip": lambda: GzipCompressor(settings.COMPRESSION_GZIP_LEVEL),
+}
+
+
+def choose_encoding(accept_encoding: str, encodings: Sequence[str]) -> str | None:
+    """
+    The first of `encodings` that the Accept-Encoding header allows.
+    """
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        key, _, value = params.partition("=")
+        if key.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    for encoding in encodings:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def _is_compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers or "no-transform" in headers.get(
+        "cache-control", ""
+    ):
+        return False
+    content_type = headers.get("content-type", "").partition(";")[0].strip()
+    return (
+        content_type.startswith("text/")
+        or content_type in COMPRESSIBLE_TYPES
+        or content_type.endswith(("+json", "+xml"))
+    )
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with the first of `encodings` the client accepts.
+
+    A body sent in one message is compressed when it has at least
+    `minimum_size` bytes. Streamed bodies are compressed and flushed chunk by
+    chunk, so they aren't buffered.
+    """
+
+    def __init__(
+        self, app: ASGIApp, *, encodings: Sequence[str], minimum_size: int
+    ) -> None:
+        self.app = app
+        self.encodings = encodings
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        encoding = choose_encoding(accept_encoding, self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder)
+
+
+class _CompressingResponder:
+    def __init__(self, send: Send, encoding: str, minimum_size: int) -> None:
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        # Held back until the first body message shows whether to compress
+        self.start_message: Message | None = None
+        self.compressor: Compressor | None = None
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        if self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start_message["headers"])
+            if not _is_compressible(headers):
+                await self.send(start_message)
+                await self.send(message)
+                return
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body and len(body) < self.minimum_size:
+                await self.send(start_message)
+                await self.send(message)
+                return
+            self.compressor = COMPRESSORS[self.encoding]()
+            headers["Content-Encoding"] = self.encoding
+            if more_body:
+                # The compressed length isn't known until the end
+                del headers["Content-Length"]
+            body = self._compress(body, more_body)
+            if not more_body:
+                headers["Content-Length"] = str(len(body))
+            await self.send(start_message)
+        elif self.compressor is not None:
+            body = self._compress(body, more_body)
+        else:
+            await self.send(message)
+            return
+
+        await self.send(
+            {"type": "http.response.body", "body": body, "more_body": more_body}
+        )
+
+    def _compress(self, body: bytes, more_body: bool) -> bytes:
+        assert self.compressor is not None
+        data = self.compressor.compress(body)
+        if more_body:
+            return data + self.compressor.flush()
+        return data + self.compressor.finish()
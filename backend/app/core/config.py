@@ -69,6 +69,68 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # Connection pool of each API worker, the Dockerfile runs 4 of them
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    # Replace connections older than this many seconds, -1 keeps them forever
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Behind PgBouncer (transaction pooling): no local pool, no prepared statements
+    DB_PGBOUNCER: bool = False
+
+    # Read only replicas, as comma separated postgresql:// URLs
+    DB_REPLICA_URLS: Annotated[
+        list[PostgresDsn] | str, BeforeValidator(parse_cors)
+    ] = []
+    # A replica that failed to connect is skipped for this long
+    DB_REPLICA_RETRY_SECONDS: float = 30.0
+    # After a user writes, their reads go to the primary for this long
+    DB_REPLICA_READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def SQLALCHEMY_REPLICA_URIS(self) -> list[str]:
+        return [
+            str(url).replace(f"{url.scheme}://", "postgresql+psycopg://", 1)
+            for url in self.DB_REPLICA_URLS
+            if not isinstance(url, str)
+        ]
+
+    # Serve the item routes with async handlers on an AsyncEngine instead of
+    # sync handlers in the threadpool
+    DB_ASYNC: bool = False
+
+    # Serialize list pages straight from the rows, skipping response_model
+    FAST_LIST_RESPONSES: bool = False
+    # Matches of a search that are ranked, a word found in more items only ranks
+    # the first ones by id. 0 ranks every match
+    ITEM_SEARCH_MAX_RANKED: int = 2000
+
+    # Content-Encodings used to compress responses, by order of preference.
+    # [] disables the compression
+    COMPRESSION_ENCODINGS: Annotated[
+        list[Literal["zstd", "br", "gzip"]] | str, BeforeValidator(parse_cors)
+    ] = ["zstd", "br", "gzip"]
+    # Smaller responses are sent as they are, streamed ones are always compressed
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    # Fast levels, higher ones cost much more CPU for a few % smaller pages,
+    # see benchmarks/compression.py
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    COMPRESSION_BROTLI_QUALITY: int = 1
+    COMPRESSION_GZIP_LEVEL: int = 1
+
+    # Processes that run bcrypt, 0 hashes inline in the calling thread
+    PASSWORD_HASH_WORKERS: int = 2
+    # Running plus queued hashing jobs per API worker before new ones get a 503
+    PASSWORD_HASH_MAX_PENDING: int = 8
+
+    # Authenticated users kept in memory per worker, 0 disables the cache
+    AUTH_CACHE_SIZE: int = 10_000
+    AUTH_CACHE_TTL_SECONDS: float = 60.0
+    # Postgres NOTIFY channel used to evict changed users in every worker
+    AUTH_CACHE_CHANNEL: str | None = None
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -86,6 +148,45 @@ class Settings(BaseSettings):
 
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 48
 
+    # Delivery of queued emails by app/email_worker.py
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_POLL_SECONDS: float = 1.0
+    # Failed sends are retried after 1, 2, 4... times this, up to an hour
+    EMAIL_OUTBOX_RETRY_SECONDS: float = 30.0
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8
+
+    # Users with more items than this are deactivated and purged by
+    # app/purge_worker.py instead of being deleted within the request
+    USER_PURGE_INLINE_ITEMS: int = 10_000
+    # Items deleted per transaction by the purge worker
+    USER_PURGE_BATCH_SIZE: int = 5_000
+    USER_PURGE_POLL_SECONDS: float = 1.0
+
+    # Required as a bearer token by /metrics when set
+    METRICS_TOKEN: str | None = None
+    # Port where app/email_worker.py serves its own metrics, off when not set
+    EMAIL_WORKER_METRICS_PORT: int | None = None
+
+    # Statements slower than this are logged with their parameters, 0 disables it
+    SQL_SLOW_QUERY_SECONDS: float = 0.5
+    # A request running the same statement this many times logs a warning, it's
+    # likely an N+1. 0 disables it
+    SQL_REPEATED_QUERY_WARNING: int = 10
+    # Report the queries of each request and their time in a Server-Timing
+    # header, by default only in the local environment
+    SERVER_TIMING: bool | None = None
+
+    @model_validator(mode="after")
+    def _set_default_server_timing(self) -> Self:
+        if self.SERVER_TIMING is None:
+            self.SERVER_TIMING = self.ENVIRONMENT == "local"
+        return self
+
+    # Superusers can profile a request by sending an X-Profile header
+    PROFILING_ENABLED: bool = True
+    # Seconds between two samples of the profiler
+    PROFILING_INTERVAL: float = 0.001
+
     @computed_field  # type: ignore[prop-decorator]
     @property
     def emails_enabled(self) -> bool:
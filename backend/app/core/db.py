@@ -1,10 +1,149 @@
+import itertools
+import os
+import threading
+import time
+from collections.abc import Sequence
+from typing import Any, Generic, TypeVar
+
+from sqlalchemy import NullPool, QueuePool, exc
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import PoolProxiedConnection
 from sqlmodel import Session, create_engine, select
 
 from app import crud
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.core.queries import instrument_queries
 from app.models import User, UserCreate
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that records how long checkouts wait for a connection.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def connect(self) -> PoolProxiedConnection:
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+def engine_options(*, is_async: bool = False) -> dict[str, Any]:
+    if settings.DB_PGBOUNCER:
+        # PgBouncer pools the connections and can't keep prepared statements
+        return {"poolclass": NullPool, "connect_args": {"prepare_threshold": None}}
+    options: dict[str, Any] = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if not is_async:
+        options["poolclass"] = InstrumentedQueuePool
+    return options
+
+
+engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI), **engine_options())
+# psycopg serves both, the async engine only connects once it's used
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI), **engine_options(is_async=True)
+)
+
+
+E = TypeVar("E")
+
+
+class ReplicaRouter(Generic[E]):
+    """
+    Round robin over the replica engines, skipping the ones that failed to
+    connect in the last DB_REPLICA_RETRY_SECONDS.
+    """
+
+    def __init__(self, engines: Sequence[E]) -> None:
+        self.engines = list(engines)
+        self._next = itertools.count()
+        self._down_until: dict[int, float] = {}
+
+    def candidates(self) -> list[E]:
+        """
+        The healthy replicas, starting from the next one in turn.
+        """
+        start = next(self._next)
+        now = time.monotonic()
+        candidates = []
+        for offset in range(len(self.engines)):
+            index = (start + offset) % len(self.engines)
+            if self._down_until.get(index, 0) <= now:
+                candidates.append(self.engines[index])
+        return candidates
+
+    def mark_down(self, engine: E) -> None:
+        index = self.engines.index(engine)
+        self._down_until[index] = time.monotonic() + settings.DB_REPLICA_RETRY_SECONDS
+
+
+replicas = ReplicaRouter(
+    [create_engine(url, **engine_options()) for url in settings.SQLALCHEMY_REPLICA_URIS]
+)
+async_replicas = ReplicaRouter(
+    [
+        create_async_engine(url, **engine_options(is_async=True))
+        for url in settings.SQLALCHEMY_REPLICA_URIS
+    ]
+)
+
+instrumented = [
+    (engine, "primary"),
+    (async_engine.sync_engine, "primary_async"),
+    *[(replica, "replica") for replica in replicas.engines],
+    *[(replica.sync_engine, "replica_async") for replica in async_replicas.engines],
+]
+for instrumented_engine, name in instrumented:
+    instrument_engine(instrumented_engine, name)
+    instrument_queries(instrumented_engine)
+
+
+def pool_stats() -> dict[str, Any]:
+    """
+    Connection pool usage of the sync engine in this worker process.
+    """
+    pool = engine.pool
+    stats: dict[str, Any] = {"pid": os.getpid(), "pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            # Negative while the pool itself still has room
+            overflow=max(pool.overflow(), 0),
+        )
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update(
+            checkouts=pool.checkouts,
+            timeouts=pool.timeouts,
+            wait_seconds_total=pool.wait_seconds_total,
+            wait_seconds_max=pool.wait_seconds_max,
+        )
+    return stats
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
@@ -0,0 +1,144 @@
+import os
+import secrets
+import time
+from typing import Any
+
+from fastapi.routing import APIRoute
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import QueuePool, event
+from sqlalchemy.engine import Engine
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+# With several workers (fastapi run --workers), each process writes its samples
+# to files in this directory and /metrics adds them up. It must be emptied
+# before the workers start, scripts/start.sh does it
+MULTIPROCESS_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+# Requests that matched no route, kept under one label
+UNMATCHED_OPERATION = "unmatched"
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to send the whole response, by operation id",
+    ["operation"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUESTS = Counter(
+    "http_requests",
+    "Responses sent, by operation id and status",
+    ["operation", "status"],
+)
+# "livesum" adds up the processes still alive, a worker that exited cleanly
+# takes its requests and connections with it
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being served",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Database connections of the pools, open or checked out by a request",
+    ["engine", "state"],
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_PENDING = Gauge(
+    "password_hash_pending",
+    "bcrypt jobs running or queued in the password hashing processes",
+    multiprocess_mode="livesum",
+)
+# Incremented by app/email_worker.py, which serves them itself
+EMAILS_SENT = Counter("emails_sent", "Emails delivered to the SMTP server")
+EMAIL_SEND_FAILURES = Counter(
+    "email_send_failures", "Attempts to send an email that failed"
+)
+
+
+class MetricsMiddleware:
+    """
+    Record the latency and status of every request under the operation id of
+    the route that served it, and how many are in progress.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_PROGRESS.dec()
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            if isinstance(route, APIRoute):
+                operation = route.unique_id
+            else:
+                operation = UNMATCHED_OPERATION
+            REQUEST_DURATION.labels(operation).observe(elapsed)
+            REQUESTS.labels(operation, str(status)).inc()
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """
+    Track the open and checked out connections of the pool of `engine`.
+    """
+    if not isinstance(engine.pool, QueuePool):
+        # PgBouncer does the pooling, connections only live for a checkout
+        return
+    opened = DB_POOL_CONNECTIONS.labels(name, "open")
+    checked_out = DB_POOL_CONNECTIONS.labels(name, "checked_out")
+    event.listen(engine, "connect", lambda *_: opened.inc())
+    event.listen(engine, "close", lambda *_: opened.dec())
+    event.listen(engine, "close_detached", lambda *_: opened.dec())
+    event.listen(engine, "checkout", lambda *_: checked_out.inc())
+    event.listen(engine, "checkin", lambda *_: checked_out.dec())
+
+
+def mark_process_dead() -> None:
+    """
+    Drop the live gauges of this worker process as it shuts down.
+    """
+    if MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(os.getpid())  # type: ignore[no-untyped-call]
+
+
+def metrics(request: Request) -> Response:
+    """
+    The metrics of all the workers, in the Prometheus text format.
+    """
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        given = request.headers.get("Authorization", "")
+        if not secrets.compare_digest(given.encode(), expected.encode()):
+            return PlainTextResponse("Not authenticated", status_code=401)
+    registry: Any = REGISTRY
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)  # type: ignore[no-untyped-call]
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
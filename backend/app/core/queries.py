@@ -0,0 +1,119 @@
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Longest repr of the parameters of a slow statement that is logged
+MAX_LOGGED_PARAMETERS = 1000
+
+
+@dataclass
+class QueryStats:
+    """
+    Statements run on behalf of one request, and the time spent on them.
+    """
+
+    count: int = 0
+    seconds: float = 0.0
+    statements: Counter[str] = field(default_factory=Counter)
+
+    def most_repeated(self) -> tuple[str, int] | None:
+        if not self.statements:
+            return None
+        return self.statements.most_common(1)[0]
+
+
+# Set by QueryStatsMiddleware, the threadpool and the async engine greenlets
+# run with a copy of the request context, so they all record in the same one
+current_stats: ContextVar[QueryStats | None] = ContextVar("current_stats", default=None)
+
+
+def _before_cursor_execute(conn: Connection, *_: Any) -> None:
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Connection,
+    _cursor: Any,
+    statement: str,
+    parameters: Any,
+    _context: Any,
+    _executemany: bool,
+) -> None:
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = current_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        stats.statements[statement] += 1
+    threshold = settings.SQL_SLOW_QUERY_SECONDS
+    if threshold and elapsed >= threshold:
+        logger.warning(
+            f"slow query ({elapsed * 1000:.1f} ms): {statement} "
+            f"parameters: {repr(parameters)[:MAX_LOGGED_PARAMETERS]}"
+        )
+
+
+def instrument_queries(engine: Engine) -> None:
+    """
+    Time the statements run on `engine`, count them in the stats of the
+    current request and log the slow ones.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """
+    Count the statements each request runs, and report them in the
+    Server-Timing header and the logs. A statement repeated many times within
+    a request is likely an N+1, loading rows one by one in a loop.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = QueryStats()
+        token = current_stats.set(stats)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start" and settings.SERVER_TIMING:
+                # Statements run while streaming the body come too late for it
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"',
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_stats.reset(token)
+            self._log(scope, stats)
+
+    def _log(self, scope: Scope, stats: QueryStats) -> None:
+        request = f"{scope['method']} {scope['path']}"
+        logger.debug(
+            f"{request}: {stats.count} queries in {stats.seconds * 1000:.1f} ms"
+        )
+        repeated = stats.most_repeated()
+        limit = settings.SQL_REPEATED_QUERY_WARNING
+        if repeated and limit and repeated[1] >= limit:
+            statement, times = repeated
+            logger.warning(f"{request} ran the same query {times} times: {statement}")
@@ -1,16 +1,83 @@
+import multiprocessing
+import threading
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, TypeVar
 
 import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.metrics import PASSWORD_HASH_PENDING
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 ALGORITHM = "HS256"
 
+T = TypeVar("T")
+
+
+class PasswordHasherBusyError(Exception):
+    """
+    All password hashing workers are busy and the pending queue is full.
+    """
+
+
+# bcrypt is CPU bound, it runs in a separate pool of processes so a burst of
+# logins can't hold the GIL of the worker serving the rest of the API
+_hasher_pool: ProcessPoolExecutor | None = None
+_hasher_pending = 0
+_hasher_lock = threading.Lock()
+
+
+def _get_hasher_pool() -> ProcessPoolExecutor:
+    global _hasher_pool
+    if _hasher_pool is None:
+        _hasher_pool = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _hasher_pool
+
+
+def _run_in_hasher(fn: Callable[..., T], *args: Any) -> T:
+    global _hasher_pending, _hasher_pool
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return fn(*args)
+    with _hasher_lock:
+        if _hasher_pending >= settings.PASSWORD_HASH_MAX_PENDING:
+            raise PasswordHasherBusyError()
+        _hasher_pending += 1
+        PASSWORD_HASH_PENDING.inc()
+        pool = _get_hasher_pool()
+    try:
+        return pool.submit(fn, *args).result()
+    except BrokenProcessPool:
+        # A worker died, start a fresh pool for the next call
+        with _hasher_lock:
+            if _hasher_pool is pool:
+                _hasher_pool = None
+        raise
+    finally:
+        with _hasher_lock:
+            _hasher_pending -= 1
+            PASSWORD_HASH_PENDING.dec()
+
+
+def password_hasher_pending() -> int:
+    return _hasher_pending
+
+
+def shutdown_password_hasher() -> None:
+    global _hasher_pool
+    with _hasher_lock:
+        pool, _hasher_pool = _hasher_pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
 
 def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     expire = datetime.now(timezone.utc) + expires_delta
@@ -19,9 +86,17 @@ def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     return encoded_jwt
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def get_password_hash(password: str) -> str:
+def _get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return _run_in_hasher(_verify_password, plain_password, hashed_password)
+
+
+def get_password_hash(password: str) -> str:
+    return _run_in_hasher(_get_password_hash, password)
@@ -1,34 +1,199 @@
 import uuid
-from typing import Any
+from collections import defaultdict
+from collections.abc import Mapping, Sequence
+from typing import Any, TypeVar
 
-from sqlmodel import Session, select
+from psycopg import sql
+from sqlalchemy import Boolean, Uuid, case, column, update, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.sql.expression import ColumnClause, Values
+from sqlmodel import Session, SQLModel, col, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.core.cache import invalidate_user
+from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
-from app.models import Item, ItemCreate, User, UserCreate, UserUpdate
+from app.models import (
+    Counter,
+    Item,
+    ItemBulkUpdate,
+    ItemCreate,
+    ItemUpdate,
+    User,
+    UserCreate,
+    UserPurge,
+    UserUpdate,
+    UserUpdateMe,
+)
+
+T = TypeVar("T", bound=SQLModel)
+
+USER_COUNTER = "user"
+ITEM_COUNTER = "item"
+
+
+# Every column of an item but the search vector, only the search reads it
+ITEM_COLUMNS = [
+    column
+    for column in Item.__table__.columns  # type: ignore[attr-defined]
+    if column.name != "search_vector"
+]
+USER_COLUMNS = list(User.__table__.columns)  # type: ignore[attr-defined]
+
+
+def owner_item_counter(owner_id: uuid.UUID) -> str:
+    return f"{ITEM_COUNTER}:{owner_id}"
+
+
+def counter_upsert(deltas: Mapping[str, int]) -> Any:
+    # Sorted, so concurrent transactions lock the counter rows in the same order
+    statement = insert(Counter).values(
+        [{"name": name, "value": deltas[name]} for name in sorted(deltas)]
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[Counter.name],
+        set_={"value": Counter.value + statement.excluded.value},
+    )
+
+
+def increment_counters(*, session: Session, deltas: Mapping[str, int]) -> None:
+    # Runs in the caller's transaction, so the counts commit with the rows
+    if deltas:
+        session.exec(counter_upsert(deltas))
+
+
+def increment_counter(*, session: Session, name: str, delta: int = 1) -> None:
+    increment_counters(session=session, deltas={name: delta})
+
+
+def get_counter(*, session: Session, name: str) -> int:
+    statement = select(Counter.value).where(Counter.name == name)
+    return session.exec(statement).first() or 0
+
+
+def insert_statement(
+    columns: Sequence[Any], row: dict[str, Any], deltas: Mapping[str, int]
+) -> Any:
+    """
+    INSERT the row into the table of `columns` and apply the counter deltas,
+    in a single statement that returns `columns` of the new row.
+    """
+    inserted = insert(columns[0].table).values(row).returning(*columns).cte("inserted")
+    # Postgres runs data modifying CTEs even when the query doesn't read them
+    return inserted.select().add_cte(counter_upsert(deltas).cte("counters"))
+
+
+def attach(session: Session | AsyncSession, row: T) -> T:
+    """
+    Add a row built from RETURNING to the session as if it had loaded it, so
+    it can be deleted or refreshed later without selecting it first.
+    """
+    make_transient_to_detached(row)
+    session.add(row)
+    return row
+
+
+def update_item_statement(
+    item_id: uuid.UUID, item_in: ItemUpdate, owner_id: uuid.UUID | None
+) -> Any:
+    """
+    UPDATE the fields `item_in` sets, only if the item belongs to `owner_id`
+    when given, and return its new state.
+    """
+    statement = update(Item).where(col(Item.id) == item_id)
+    if owner_id is not None:
+        statement = statement.where(col(Item.owner_id) == owner_id)
+    return statement.values(item_in.model_dump(exclude_unset=True)).returning(
+        *ITEM_COLUMNS
+    )
+
+
+def update_user_statement(user_id: uuid.UUID, user_data: dict[str, Any]) -> Any:
+    return (
+        update(User)
+        .where(col(User.id) == user_id)
+        .values(user_data)
+        .returning(*USER_COLUMNS)
+    )
 
 
 def create_user(*, session: Session, user_create: UserCreate) -> User:
-    db_obj = User.model_validate(
+    row = User.model_validate(
         user_create, update={"hashed_password": get_password_hash(user_create.password)}
-    )
-    session.add(db_obj)
+    ).model_dump()
+    statement = insert_statement(USER_COLUMNS, row, {USER_COUNTER: 1})
+    user = User(**session.exec(statement).one()._asdict())
     session.commit()
-    session.refresh(db_obj)
-    return db_obj
+    return attach(session, user)
 
 
-def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
+def update_user(
+    *, session: Session, db_user: User, user_in: UserUpdate | UserUpdateMe
+) -> User:
+    """
+    Update the user in one UPDATE ... RETURNING, the new state is built from
+    the returned row instead of being selected again.
+    """
     user_data = user_in.model_dump(exclude_unset=True)
-    extra_data = {}
     if "password" in user_data:
-        password = user_data["password"]
-        hashed_password = get_password_hash(password)
-        extra_data["hashed_password"] = hashed_password
-    db_user.sqlmodel_update(user_data, update=extra_data)
-    session.add(db_user)
+        user_data["hashed_password"] = get_password_hash(user_data.pop("password"))
+    statement = update_user_statement(db_user.id, user_data)
+    user = User(**session.exec(statement).one()._asdict())
+    invalidate_user(session=session, user_id=db_user.id)
     session.commit()
-    session.refresh(db_user)
-    return db_user
+    return user
+
+
+def purge_user_statements(user_id: uuid.UUID) -> list[Any]:
+    """
+    Deactivate the user, so they can't log in or add items anymore, and queue
+    them for app/purge_worker.py.
+    """
+    return [
+        update(User).where(col(User.id) == user_id).values(is_active=False),
+        insert(UserPurge).values(user_id=user_id).on_conflict_do_nothing(),
+    ]
+
+
+def delete_owner_counter_statement(owner_id: uuid.UUID) -> Any:
+    return (
+        delete(Counter)
+        .where(col(Counter.name) == owner_item_counter(owner_id))
+        .returning(col(Counter.value))
+    )
+
+
+def forget_owner(*, session: Session, owner_id: uuid.UUID) -> None:
+    """
+    Take a deleted user and the items the foreign key deleted with them out of
+    the counters. Runs after the user's DELETE, so that no item can be added
+    to their counter anymore.
+    """
+    items = session.exec(delete_owner_counter_statement(owner_id)).scalar() or 0
+    increment_counters(session=session, deltas={ITEM_COUNTER: -items, USER_COUNTER: -1})
+
+
+def delete_user(*, session: Session, db_user: User) -> bool:
+    """
+    Delete the user, Postgres deletes their items through the foreign key.
+
+    Users with more than USER_PURGE_INLINE_ITEMS items would keep the request
+    and the row locks for too long, they are deactivated and queued for
+    app/purge_worker.py instead. Returns whether the user was deleted.
+    """
+    invalidate_user(session=session, user_id=db_user.id)
+    items = get_counter(session=session, name=owner_item_counter(db_user.id))
+    if items > settings.USER_PURGE_INLINE_ITEMS:
+        for statement in purge_user_statements(db_user.id):
+            session.exec(statement)
+        session.commit()
+        return False
+    session.delete(db_user)
+    session.flush()
+    forget_owner(session=session, owner_id=db_user.id)
+    session.commit()
+    return True
 
 
 def get_user_by_email(*, session: Session, email: str) -> User | None:
@@ -46,9 +211,194 @@ def authenticate(*, session: Session, email: str, password: str) -> User | None:
     return db_user
 
 
+def item_deltas(owner_id: uuid.UUID, count: int) -> dict[str, int]:
+    return {ITEM_COUNTER: count, owner_item_counter(owner_id): count}
+
+
 def create_item(*, session: Session, item_in: ItemCreate, owner_id: uuid.UUID) -> Item:
-    db_item = Item.model_validate(item_in, update={"owner_id": owner_id})
-    session.add(db_item)
+    """
+    Insert the item and count it in one statement, the item is built from the
+    returned row.
+    """
+    row = Item.model_validate(item_in, update={"owner_id": owner_id}).model_dump()
+    statement = insert_statement(ITEM_COLUMNS, row, item_deltas(owner_id, 1))
+    item = Item(**session.exec(statement).one()._asdict())
+    session.commit()
+    return attach(session, item)
+
+
+def update_item(
+    *,
+    session: Session,
+    item_id: uuid.UUID,
+    item_in: ItemUpdate,
+    owner_id: uuid.UUID | None = None,
+) -> Item | None:
+    """
+    Update the item if it exists and belongs to `owner_id`, or to anyone if
+    it's None, and return its new state as a detached item.
+    """
+    statement = update_item_statement(item_id, item_in, owner_id)
+    row = session.exec(statement).first()
+    session.commit()
+    return Item(**row._asdict()) if row else None
+
+
+def delete_item(*, session: Session, db_item: Item) -> None:
+    session.delete(db_item)
+    increment_counters(session=session, deltas=item_deltas(db_item.owner_id, -1))
+    session.commit()
+
+
+def item_rows(
+    items_in: Sequence[ItemCreate], owner_id: uuid.UUID
+) -> list[dict[str, Any]]:
+    return [
+        Item.model_validate(item_in, update={"owner_id": owner_id}).model_dump()
+        for item_in in items_in
+    ]
+
+
+def copy_items(
+    *, session: Session, items_in: Sequence[ItemCreate], owner_id: uuid.UUID
+) -> int:
+    """
+    Load the items with COPY, which is much faster than INSERT for large
+    batches, and commit them.
+    """
+    if not items_in:
+        return 0
+    # Rows built straight from the input, validating Item instances would
+    # take longer than the COPY itself
+    fields = list(ItemCreate.model_fields)
+    statement = sql.SQL("COPY {} ({}) FROM STDIN").format(
+        sql.Identifier(Item.__table__.name),  # type: ignore[attr-defined]
+        sql.SQL(", ").join(map(sql.Identifier, ["id", *fields, "owner_id"])),
+    )
+    connection = session.connection().connection.driver_connection
+    with connection.cursor() as cursor, cursor.copy(statement) as copy:  # type: ignore[union-attr]
+        for item_in in items_in:
+            values = [getattr(item_in, field) for field in fields]
+            copy.write_row([uuid.uuid4(), *values, owner_id])
+    increment_counters(
+        session=session,
+        deltas=item_deltas(owner_id, len(items_in)),
+    )
+    session.commit()
+    return len(items_in)
+
+
+def item_update_values(items_in: Sequence[ItemBulkUpdate]) -> Values:
+    """
+    VALUES list with the new column values of each item, plus a `<field>_set`
+    flag per field so that fields left out of a row keep their current value.
+    """
+    fields = list(ItemUpdate.model_fields)
+    table = Item.__table__  # type: ignore[attr-defined]
+    columns: list[ColumnClause[Any]] = [column("id", Uuid)]
+    for field in fields:
+        columns += [column(field, table.c[field].type), column(f"{field}_set", Boolean)]
+    rows = []
+    for item_in in items_in:
+        row: list[Any] = [item_in.id]
+        for field in fields:
+            row += [getattr(item_in, field), field in item_in.model_fields_set]
+        rows.append(tuple(row))
+    return values(*columns, name="item_update").data(rows)
+
+
+def update_items_statement(
+    items_in: Sequence[ItemBulkUpdate], owner_id: uuid.UUID | None
+) -> Any:
+    """
+    One UPDATE for all the rows, limited to the items of `owner_id` if given.
+    """
+    new = item_update_values(items_in)
+    statement = update(Item).where(col(Item.id) == new.c.id)
+    if owner_id is not None:
+        statement = statement.where(col(Item.owner_id) == owner_id)
+    return (
+        statement.values(
+            {
+                field: case(
+                    (new.c[f"{field}_set"], new.c[field]), else_=getattr(Item, field)
+                )
+                for field in ItemUpdate.model_fields
+            }
+        )
+        # Plain columns, the identity map wouldn't refresh already loaded items
+        .returning(*ITEM_COLUMNS)
+    )
+
+
+def delete_items_statement(ids: Sequence[uuid.UUID], owner_id: uuid.UUID | None) -> Any:
+    statement = delete(Item).where(col(Item.id).in_(ids))
+    if owner_id is not None:
+        statement = statement.where(col(Item.owner_id) == owner_id)
+    return statement.returning(col(Item.id), col(Item.owner_id))
+
+
+def deleted_item_deltas(deleted: Sequence[Any]) -> dict[str, int]:
+    deltas: defaultdict[str, int] = defaultdict(int)
+    for row in deleted:
+        deltas[ITEM_COUNTER] -= 1
+        deltas[owner_item_counter(row.owner_id)] -= 1
+    return deltas
+
+
+def create_items(
+    *, session: Session, items_in: Sequence[ItemCreate], owner_id: uuid.UUID
+) -> list[Item]:
+    """
+    Insert all the items in one transaction, batched into multi-row INSERTs.
+    """
+    if not items_in:
+        return []
+    statement = insert(Item).returning(Item, sort_by_parameter_order=True)
+    items = list(session.scalars(statement, item_rows(items_in, owner_id)))
+    increment_counters(
+        session=session,
+        deltas=item_deltas(owner_id, len(items)),
+    )
+    # Detached, so the commit doesn't expire them and reading them doesn't
+    # reload each one
+    for item in items:
+        session.expunge(item)
+    session.commit()
+    return items
+
+
+def update_items(
+    *,
+    session: Session,
+    items_in: Sequence[ItemBulkUpdate],
+    owner_id: uuid.UUID | None = None,
+) -> list[Item]:
+    """
+    Update the items that exist and belong to `owner_id`, or to anyone if it's
+    None, and return their new state as detached items.
+    """
+    if not items_in:
+        return []
+    rows = session.exec(update_items_statement(items_in, owner_id)).all()
+    items = [Item.model_validate(row._mapping) for row in rows]
+    session.commit()
+    return items
+
+
+def delete_items(
+    *,
+    session: Session,
+    ids: Sequence[uuid.UUID],
+    owner_id: uuid.UUID | None = None,
+) -> list[uuid.UUID]:
+    """
+    Delete the items that exist and belong to `owner_id`, or to anyone if it's
+    None, and return their ids.
+    """
+    if not ids:
+        return []
+    deleted = session.exec(delete_items_statement(ids, owner_id)).all()
+    increment_counters(session=session, deltas=deleted_item_deltas(deleted))
     session.commit()
-    session.refresh(db_item)
-    return db_item
+    return [row.id for row in deleted]
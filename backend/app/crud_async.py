@@ -0,0 +1,108 @@
+import uuid
+from collections.abc import Mapping, Sequence
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.crud import (
+    ITEM_COLUMNS,
+    attach,
+    counter_upsert,
+    delete_items_statement,
+    deleted_item_deltas,
+    insert_statement,
+    item_deltas,
+    item_rows,
+    update_item_statement,
+    update_items_statement,
+)
+from app.models import Counter, Item, ItemBulkUpdate, ItemCreate, ItemUpdate
+
+# Async counterparts of the app.crud item helpers, for the item routes of the
+# AsyncSession stack (settings.DB_ASYNC). The other routes are sync, they use
+# app.crud.
+
+
+async def increment_counters(
+    *, session: AsyncSession, deltas: Mapping[str, int]
+) -> None:
+    if deltas:
+        await session.exec(counter_upsert(deltas))
+
+
+async def get_counter(*, session: AsyncSession, name: str) -> int:
+    statement = select(Counter.value).where(Counter.name == name)
+    return (await session.exec(statement)).first() or 0
+
+
+async def create_item(
+    *, session: AsyncSession, item_in: ItemCreate, owner_id: uuid.UUID
+) -> Item:
+    row = Item.model_validate(item_in, update={"owner_id": owner_id}).model_dump()
+    statement = insert_statement(ITEM_COLUMNS, row, item_deltas(owner_id, 1))
+    item = Item(**(await session.exec(statement)).one()._asdict())
+    await session.commit()
+    return attach(session, item)
+
+
+async def update_item(
+    *,
+    session: AsyncSession,
+    item_id: uuid.UUID,
+    item_in: ItemUpdate,
+    owner_id: uuid.UUID | None = None,
+) -> Item | None:
+    statement = update_item_statement(item_id, item_in, owner_id)
+    row = (await session.exec(statement)).first()
+    await session.commit()
+    return Item(**row._asdict()) if row else None
+
+
+async def delete_item(*, session: AsyncSession, db_item: Item) -> None:
+    await session.delete(db_item)
+    await increment_counters(session=session, deltas=item_deltas(db_item.owner_id, -1))
+    await session.commit()
+
+
+async def create_items(
+    *, session: AsyncSession, items_in: Sequence[ItemCreate], owner_id: uuid.UUID
+) -> list[Item]:
+    if not items_in:
+        return []
+    statement = insert(Item).returning(Item, sort_by_parameter_order=True)
+    items = list(await session.scalars(statement, item_rows(items_in, owner_id)))
+    await increment_counters(
+        session=session,
+        deltas=item_deltas(owner_id, len(items)),
+    )
+    await session.commit()
+    return items
+
+
+async def update_items(
+    *,
+    session: AsyncSession,
+    items_in: Sequence[ItemBulkUpdate],
+    owner_id: uuid.UUID | None = None,
+) -> list[Item]:
+    if not items_in:
+        return []
+    rows = (await session.exec(update_items_statement(items_in, owner_id))).all()
+    items = [Item.model_validate(row._mapping) for row in rows]
+    await session.commit()
+    return items
+
+
+async def delete_items(
+    *,
+    session: AsyncSession,
+    ids: Sequence[uuid.UUID],
+    owner_id: uuid.UUID | None = None,
+) -> list[uuid.UUID]:
+    if not ids:
+        return []
+    deleted = (await session.exec(delete_items_statement(ids, owner_id))).all()
+    await increment_counters(session=session, deltas=deleted_item_deltas(deleted))
+    await session.commit()
+    return [row.id for row in deleted]
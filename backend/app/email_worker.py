@@ -0,0 +1,100 @@
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from emails.backend.smtp import SMTPBackend  # type: ignore
+from prometheus_client import start_http_server
+from sqlmodel import Session, col, delete, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.metrics import EMAIL_SEND_FAILURES, EMAILS_SENT
+from app.models import OutboxEmail
+from app.utils import get_smtp_options, send_email
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_SECONDS = 3600.0
+
+
+def retry_delay(attempts: int) -> timedelta:
+    seconds = settings.EMAIL_OUTBOX_RETRY_SECONDS * 2.0 ** min(attempts - 1, 32)
+    return timedelta(seconds=min(seconds, MAX_RETRY_SECONDS))
+
+
+def deliver_batch(*, session: Session, smtp: SMTPBackend) -> int:
+    """
+    Send the emails that are due over the connection of `smtp` and return how
+    many were attempted. That's fewer than the batch size when the server
+    can't be reached, so the caller waits before the next batch.
+
+    The claimed rows stay locked until the batch commits, SKIP LOCKED lets
+    several workers share the outbox.
+    """
+    now = datetime.now(timezone.utc)
+    statement = (
+        select(OutboxEmail)
+        .where(
+            col(OutboxEmail.next_attempt_at) <= now,
+            col(OutboxEmail.attempts) < settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+        )
+        .order_by(col(OutboxEmail.next_attempt_at))
+        .limit(settings.EMAIL_OUTBOX_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    )
+    outbox = session.exec(statement).all()
+    sent = []
+    attempted = 0
+    for email in outbox:
+        attempted += 1
+        try:
+            response = send_email(
+                email_to=email.email_to,
+                subject=email.subject,
+                html_content=email.html_content,
+                smtp=smtp,
+            )
+        except Exception as e:
+            # A message that can't be built must not hold up the others
+            error, reached_server = repr(e), True
+        else:
+            if response.success:
+                sent.append(email.id)
+                continue
+            error = str(response.error or response.status_text)
+            reached_server = response.status_code is not None
+        EMAIL_SEND_FAILURES.inc()
+        email.attempts += 1
+        email.last_error = error
+        email.next_attempt_at = now + retry_delay(email.attempts)
+        session.add(email)
+        if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            logger.error(f"giving up on email {email.id}: {error}")
+        if not reached_server:
+            # No reply from the server, leave the rest for the next batch
+            break
+    if sent:
+        session.exec(delete(OutboxEmail).where(col(OutboxEmail.id).in_(sent)))  # type: ignore
+    session.commit()
+    EMAILS_SENT.inc(len(sent))
+    return attempted
+
+
+def main() -> None:
+    logger.info("Starting email worker")
+    if settings.EMAIL_WORKER_METRICS_PORT:
+        start_http_server(settings.EMAIL_WORKER_METRICS_PORT)
+    with SMTPBackend(fail_silently=True, **get_smtp_options()) as smtp:
+        while True:
+            with Session(engine) as session:
+                attempted = deliver_batch(session=session, smtp=smtp)
+            if attempted < settings.EMAIL_OUTBOX_BATCH_SIZE:
+                # Drained or the server is down, don't hold the SMTP
+                # connection while idle
+                smtp.close()
+                time.sleep(settings.EMAIL_OUTBOX_POLL_SECONDS)
+
+
+if __name__ == "__main__":
+    main()
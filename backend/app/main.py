@@ -1,16 +1,41 @@
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+
 import sentry_sdk
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.api.profiling import ProfilingMiddleware
+from app.core import security
+from app.core.cache import InvalidationListener
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, mark_process_dead, metrics
+from app.core.queries import QueryStatsMiddleware
+from app.utils import load_email_templates
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncGenerator[None, None]:
+    load_email_templates()
+    listener = None
+    if settings.AUTH_CACHE_CHANNEL:
+        listener = InvalidationListener()
+        listener.start()
+    yield
+    if listener:
+        listener.stop()
+    security.shutdown_password_hasher()
+    mark_process_dead()
+
+
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
@@ -18,8 +43,13 @@ app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
+# Innermost, so that CORS and compression apply to the profiles too
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 # Set all CORS enabled origins
 if settings.all_cors_origins:
     app.add_middleware(
@@ -30,4 +60,30 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+# Queries of each request, in the Server-Timing header
+app.add_middleware(QueryStatsMiddleware)
+
+if settings.COMPRESSION_ENCODINGS:
+    app.add_middleware(
+        CompressionMiddleware,
+        encodings=settings.COMPRESSION_ENCODINGS,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    )
+
+# Outermost, so the latency includes the compression
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(security.PasswordHasherBusyError)
+def password_hasher_busy_handler(
+    _request: Request, _exc: security.PasswordHasherBusyError
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many password checks in progress, try again"},
+        headers={"Retry-After": "1"},
+    )
+
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
+app.add_route("/metrics", metrics, include_in_schema=False)
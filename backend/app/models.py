@@ -1,7 +1,15 @@
 import uuid
+from datetime import datetime, timezone
+from typing import Literal
 
 from pydantic import EmailStr
-from sqlmodel import Field, Relationship, SQLModel
+from sqlalchemy import BigInteger, Column, Computed, DateTime, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlmodel import Field, Index, Relationship, SQLModel, func
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
 
 
 # Shared properties
@@ -43,7 +51,16 @@ class UpdatePassword(SQLModel):
 class User(UserBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     hashed_password: str
-    items: list["Item"] = Relationship(back_populates="owner", cascade_delete=True)
+    # Set again on every UPDATE, the ETag of the user's responses
+    updated_at: datetime = Field(
+        default_factory=utcnow,
+        sa_type=DateTime(timezone=True),  # type: ignore[call-overload]
+        sa_column_kwargs={"onupdate": utcnow, "server_default": func.now()},
+    )
+    # Postgres deletes the items (ondelete="CASCADE"), the ORM never loads them
+    items: list["Item"] = Relationship(
+        back_populates="owner", cascade_delete=True, passive_deletes=True
+    )
 
 
 # Properties to return via API, id is always required
@@ -53,7 +70,8 @@ class UserPublic(UserBase):
 
 class UsersPublic(SQLModel):
     data: list[UserPublic]
-    count: int
+    count: int | None
+    next_cursor: str | None = None
 
 
 # Shared properties
@@ -72,13 +90,56 @@ class ItemUpdate(ItemBase):
     title: str | None = Field(default=None, min_length=1, max_length=255)  # type: ignore
 
 
+# Text search configuration of Item.search_vector, queries must use the same one
+ITEM_SEARCH_CONFIG = "english"
+
+
 # Database model, database table inferred from class name
 class Item(ItemBase, table=True):
+    __table_args__ = (
+        # Keyset pagination walks items in (owner_id, id) order
+        Index("ix_item_owner_id_id", "owner_id", "id"),
+        # One index per ItemSort, across all items and for a single owner.
+        # Titles are compared bytewise, so that prefixes are index ranges
+        Index("ix_item_created_at_id", "created_at", "id"),
+        Index("ix_item_owner_id_created_at_id", "owner_id", "created_at", "id"),
+        Index("ix_item_updated_at_id", "updated_at", "id"),
+        Index("ix_item_owner_id_updated_at_id", "owner_id", "updated_at", "id"),
+        Index("ix_item_title_id", text('title COLLATE "C"'), "id"),
+        Index("ix_item_owner_id_title_id", "owner_id", text('title COLLATE "C"'), "id"),
+        Index("ix_item_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     title: str = Field(max_length=255)
     owner_id: uuid.UUID = Field(
         foreign_key="user.id", nullable=False, ondelete="CASCADE"
     )
+    created_at: datetime = Field(
+        default_factory=utcnow,
+        sa_type=DateTime(timezone=True),  # type: ignore[call-overload]
+        sa_column_kwargs={"server_default": func.now()},
+    )
+    # Set again on every UPDATE, the ETag of the item's responses
+    updated_at: datetime = Field(
+        default_factory=utcnow,
+        sa_type=DateTime(timezone=True),  # type: ignore[call-overload]
+        sa_column_kwargs={"onupdate": utcnow, "server_default": func.now()},
+    )
+    # Kept up to date by Postgres, title words rank above description words
+    search_vector: str | None = Field(
+        default=None,
+        exclude=True,
+        sa_column=Column(
+            TSVECTOR,
+            Computed(
+                f"setweight(to_tsvector('{ITEM_SEARCH_CONFIG}', title), 'A') || "
+                f"setweight(to_tsvector('{ITEM_SEARCH_CONFIG}', "
+                "coalesce(description, '')), 'B')",
+                persisted=True,
+            ),
+        ),
+    )
     owner: User | None = Relationship(back_populates="items")
 
 
@@ -90,7 +151,112 @@ class ItemPublic(ItemBase):
 
 class ItemsPublic(SQLModel):
     data: list[ItemPublic]
-    count: int
+    count: int | None
+    next_cursor: str | None = None
+
+
+# Sort orders of GET /items/, "-" sorts in descending order
+ItemSort = Literal[
+    "created_at", "-created_at", "updated_at", "-updated_at", "title", "-title"
+]
+
+
+# Query parameters of GET /items/, items match all the ones that are set
+class ItemsFilter(SQLModel):
+    title_prefix: str | None = Field(default=None, min_length=1, max_length=255)
+    owner_id: uuid.UUID | None = None
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+    updated_after: datetime | None = None
+    updated_before: datetime | None = None
+
+
+# Rows accepted by a single bulk item request
+MAX_BULK_ITEMS = 5000
+
+
+class ItemsBulkCreate(SQLModel):
+    data: list[ItemCreate] = Field(max_length=MAX_BULK_ITEMS)
+
+
+class ItemBulkUpdate(ItemUpdate):
+    id: uuid.UUID
+
+
+class ItemsBulkUpdate(SQLModel):
+    data: list[ItemBulkUpdate] = Field(max_length=MAX_BULK_ITEMS)
+
+
+class ItemsBulkDelete(SQLModel):
+    ids: list[uuid.UUID] = Field(max_length=MAX_BULK_ITEMS)
+
+
+# Outcome of one row of a bulk request, in the order of the request
+class ItemBulkResult(SQLModel):
+    id: uuid.UUID
+    status: Literal["created", "updated", "deleted", "not_found"]
+    item: ItemPublic | None = None
+
+
+class ItemsBulkResults(SQLModel):
+    data: list[ItemBulkResult]
+
+
+class ItemImportError(SQLModel):
+    line: int
+    error: str
+
+
+# Outcome of one chunk of an import, each chunk is committed on its own
+class ItemsImportChunk(SQLModel):
+    first_line: int
+    rows: int = 0
+    imported: int = 0
+    errors: list[ItemImportError] = []
+
+
+class ItemsImportResult(SQLModel):
+    data: list[ItemsImportChunk]
+    imported: int
+    failed: int
+    rows_per_second: float
+
+
+# Row counts maintained on write, so list endpoints don't need a count(*)
+class Counter(SQLModel, table=True):
+    name: str = Field(primary_key=True, max_length=255)
+    value: int = Field(default=0, sa_type=BigInteger)
+
+
+# Emails waiting for app/email_worker.py, which deletes them once delivered
+class OutboxEmail(SQLModel, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    email_to: str = Field(max_length=255)
+    subject: str
+    html_content: str
+    attempts: int = 0
+    next_attempt_at: datetime = Field(
+        default_factory=utcnow,
+        sa_type=DateTime(timezone=True),  # type: ignore[call-overload]
+        index=True,
+    )
+    last_error: str | None = None
+    created_at: datetime = Field(
+        default_factory=utcnow,
+        sa_type=DateTime(timezone=True),  # type: ignore[call-overload]
+    )
+
+
+# Users deleted with too many items to delete in a request, app/purge_worker.py
+# deletes their items in batches and then the user
+class UserPurge(SQLModel, table=True):
+    user_id: uuid.UUID = Field(
+        foreign_key="user.id", primary_key=True, ondelete="CASCADE"
+    )
+    created_at: datetime = Field(
+        default_factory=utcnow,
+        sa_type=DateTime(timezone=True),  # type: ignore[call-overload]
+    )
 
 
 # Generic message
@@ -0,0 +1,62 @@
+import logging
+import time
+
+from sqlmodel import Session, col, delete, select
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.models import Item, User, UserPurge
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def purge_batch(*, session: Session) -> int:
+    """
+    Delete up to USER_PURGE_BATCH_SIZE items of the first queued user, and the
+    user once they have none left, and return how many items were deleted.
+
+    Each batch is a short transaction, so the item row locks are released
+    quickly. The queued user stays locked until the batch commits, SKIP
+    LOCKED lets several workers purge different users.
+    """
+    statement = (
+        select(UserPurge)
+        .order_by(col(UserPurge.created_at))
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    purge = session.exec(statement).first()
+    if not purge:
+        return 0
+    user_id = purge.user_id
+    batch = (
+        select(Item.id)
+        .where(Item.owner_id == user_id)
+        .limit(settings.USER_PURGE_BATCH_SIZE)
+    )
+    deleted: int = session.exec(
+        delete(Item).where(col(Item.id).in_(batch.scalar_subquery()))  # type: ignore
+    ).rowcount
+    crud.increment_counters(session=session, deltas=crud.item_deltas(user_id, -deleted))
+    if deleted < settings.USER_PURGE_BATCH_SIZE:
+        # The queue entry goes with the user, through the foreign key
+        session.exec(delete(User).where(col(User.id) == user_id))  # type: ignore
+        crud.forget_owner(session=session, owner_id=user_id)
+        logger.info(f"purged user {user_id}")
+    session.commit()
+    return deleted
+
+
+def main() -> None:
+    logger.info("Starting purge worker")
+    while True:
+        with Session(engine) as session:
+            deleted = purge_batch(session=session)
+        if not deleted:
+            time.sleep(settings.USER_PURGE_POLL_SECONDS)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,21 @@
+import csv
+import io
+import json
 import uuid
+from datetime import datetime, timezone
+from typing import get_args
+from unittest.mock import patch
 
+import psycopg
+import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session
 
+from app.api.pagination import encode_cursor
 from app.core.config import settings
+from app.models import MAX_BULK_ITEMS, Item, ItemSort
 from app.tests.utils.item import create_random_item
+from app.tests.utils.utils import random_lower_string
 
 
 def test_create_item(
@@ -40,6 +51,28 @@ def test_read_item(
     assert content["owner_id"] == str(item.owner_id)
 
 
+def test_read_item_etag(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    url = f"{settings.API_V1_STR}/items/{item.id}"
+    r = client.get(url, headers=superuser_token_headers)
+    etag = r.headers["etag"]
+    assert etag.startswith('W/"')
+
+    headers = {**superuser_token_headers, "If-None-Match": etag}
+    r = client.get(url, headers=headers)
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["etag"] == etag
+
+    client.put(url, headers=superuser_token_headers, json={"title": "Changed"})
+    r = client.get(url, headers=headers)
+    assert r.status_code == 200
+    assert r.json()["title"] == "Changed"
+    assert r.headers["etag"] != etag
+
+
 def test_read_item_not_found(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
@@ -79,6 +112,512 @@ def test_read_items(
     assert len(content["data"]) >= 2
 
 
+def test_read_items_with_cursor(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    created_ids = set()
+    for _ in range(3):
+        r = client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+            json={"title": "Paged"},
+        )
+        created_ids.add(r.json()["id"])
+
+    seen_ids: list[str] = []
+    params: dict[str, str | int] = {"limit": 2}
+    while True:
+        response = client.get(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+            params=params,
+        )
+        assert response.status_code == 200
+        content = response.json()
+        assert len(content["data"]) <= 2
+        seen_ids.extend(item["id"] for item in content["data"])
+        if not content["next_cursor"]:
+            break
+        params = {"limit": 2, "cursor": content["next_cursor"]}
+
+    assert len(seen_ids) == len(set(seen_ids))
+    assert seen_ids == sorted(seen_ids)
+    assert created_ids <= set(seen_ids)
+
+
+def test_read_items_count(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers)
+    count = r.json()["count"]
+
+    r = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Counted"},
+    )
+    item_id = r.json()["id"]
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers)
+    assert r.json()["count"] == count + 1
+
+    client.delete(
+        f"{settings.API_V1_STR}/items/{item_id}", headers=normal_user_token_headers
+    )
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers)
+    assert r.json()["count"] == count
+
+
+def test_read_items_fast_responses(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    create_random_item(db)
+    create_random_item(db)
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=superuser_token_headers)
+    with patch("app.core.config.settings.FAST_LIST_RESPONSES", True):
+        fast = client.get(
+            f"{settings.API_V1_STR}/items/", headers=superuser_token_headers
+        )
+        assert fast.status_code == 200
+        assert fast.json() == r.json()
+        assert fast.headers["etag"] == r.headers["etag"]
+        headers = {**superuser_token_headers, "If-None-Match": fast.headers["etag"]}
+        cached = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert cached.status_code == 304
+
+
+def test_search_items(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    word = random_lower_string()
+    created = {}
+    for name, headers, body in [
+        ("title", normal_user_token_headers, {"title": f"{word} lamp"}),
+        (
+            "description",
+            normal_user_token_headers,
+            {"title": "Desk", "description": word},
+        ),
+        ("other_owner", superuser_token_headers, {"title": word}),
+        ("unrelated", normal_user_token_headers, {"title": "Chair"}),
+    ]:
+        r = client.post(f"{settings.API_V1_STR}/items/", headers=headers, json=body)
+        created[name] = r.json()["id"]
+
+    response = client.get(
+        f"{settings.API_V1_STR}/items/search",
+        headers=normal_user_token_headers,
+        params={"q": word},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    # Matches in the title rank above matches in the description
+    assert [item["id"] for item in content["data"]] == [
+        created["title"],
+        created["description"],
+    ]
+    assert content["count"] is None
+    assert content["next_cursor"] is None
+
+    response = client.get(
+        f"{settings.API_V1_STR}/items/search",
+        headers=superuser_token_headers,
+        params={"q": word},
+    )
+    assert {item["id"] for item in response.json()["data"]} == {
+        created["title"],
+        created["description"],
+        created["other_owner"],
+    }
+
+    response = client.get(
+        f"{settings.API_V1_STR}/items/search",
+        headers=normal_user_token_headers,
+        params={"q": f"{word} -lamps"},
+    )
+    assert [item["id"] for item in response.json()["data"]] == [created["description"]]
+
+
+def test_search_items_with_cursor(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    word = random_lower_string()
+    created_ids = set()
+    for title in [word, f"{word} {word}", f"{word} shelf", "Shelf"]:
+        r = client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+            json={"title": title},
+        )
+        created_ids.add(r.json()["id"])
+    created_ids.remove(r.json()["id"])
+
+    seen_ids: list[str] = []
+    params: dict[str, str | int] = {"q": word, "limit": 2}
+    while True:
+        response = client.get(
+            f"{settings.API_V1_STR}/items/search",
+            headers=normal_user_token_headers,
+            params=params,
+        )
+        assert response.status_code == 200
+        content = response.json()
+        seen_ids.extend(item["id"] for item in content["data"])
+        if not content["next_cursor"]:
+            break
+        params = {"q": word, "limit": 2, "cursor": content["next_cursor"]}
+
+    assert len(seen_ids) == len(set(seen_ids))
+    assert set(seen_ids) == created_ids
+
+
+def test_search_items_ranks_own_matches(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    word = random_lower_string()
+    own_ids = []
+    for headers in [superuser_token_headers] * 6 + [normal_user_token_headers] * 3:
+        r = client.post(
+            f"{settings.API_V1_STR}/items/", headers=headers, json={"title": word}
+        )
+        if headers is normal_user_token_headers:
+            own_ids.append(r.json()["id"])
+
+    # The other owners' matches don't use up the cap, and every page ranks the
+    # same first matches by id
+    seen_ids: list[str] = []
+    params: dict[str, str | int] = {"q": word, "limit": 1}
+    with patch("app.core.config.settings.ITEM_SEARCH_MAX_RANKED", 2):
+        while True:
+            response = client.get(
+                f"{settings.API_V1_STR}/items/search",
+                headers=normal_user_token_headers,
+                params=params,
+            )
+            content = response.json()
+            seen_ids.extend(item["id"] for item in content["data"])
+            if not content["next_cursor"]:
+                break
+            params = {"q": word, "limit": 1, "cursor": content["next_cursor"]}
+    assert sorted(seen_ids) == sorted(own_ids)[:2]
+
+
+def test_export_items_ndjson(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/export", headers=superuser_token_headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "items.ndjson" in response.headers["content-disposition"]
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert {
+        "id": str(item.id),
+        "title": item.title,
+        "description": item.description,
+        "owner_id": str(item.owner_id),
+    } in rows
+
+
+def test_export_items_csv_only_own(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    other_item = create_random_item(db)
+    r = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Exported"},
+    )
+    own_item = r.json()
+    response = client.get(
+        f"{settings.API_V1_STR}/items/export",
+        headers=normal_user_token_headers,
+        params={"format": "csv"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert {row["id"] for row in rows} >= {own_item["id"]}
+    assert str(other_item.id) not in {row["id"] for row in rows}
+    assert {row["owner_id"] for row in rows} == {own_item["owner_id"]}
+
+
+def test_import_items_ndjson(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers)
+    count = r.json()["count"]
+    lines = [
+        json.dumps({"title": "Imported", "description": "first"}),
+        json.dumps({"title": ""}),
+        "",
+        "not json",
+        json.dumps({"title": "Imported"}),
+    ]
+    response = client.post(
+        f"{settings.API_V1_STR}/items/import",
+        headers=normal_user_token_headers,
+        files={"file": ("items.ndjson", "\n".join(lines))},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["imported"] == 2
+    assert content["failed"] == 2
+    assert content["rows_per_second"] > 0
+    [chunk] = content["data"]
+    assert chunk["rows"] == 4
+    assert [error["line"] for error in chunk["errors"]] == [2, 4]
+    assert chunk["errors"][0]["error"].startswith("title:")
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers)
+    assert r.json()["count"] == count + 2
+
+
+def test_import_items_unreadable_rows(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    ndjson = b"\n".join(
+        [json.dumps({"title": "Imported"}).encode(), b'{"title": "\xff"}']
+    )
+    response = client.post(
+        f"{settings.API_V1_STR}/items/import",
+        headers=normal_user_token_headers,
+        files={"file": ("items.ndjson", ndjson)},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["imported"] == 1
+    assert content["data"][0]["errors"] == [
+        {"line": 2, "error": "row: not valid UTF-8"}
+    ]
+
+    too_large = "x" * (csv.field_size_limit() + 1)
+    rows = ["title,description", "\xff,bad byte", f"{too_large},too large", "Ok,"]
+    response = client.post(
+        f"{settings.API_V1_STR}/items/import",
+        headers=normal_user_token_headers,
+        params={"format": "csv"},
+        files={"file": ("items.csv", "\n".join(rows).encode("latin-1"))},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["imported"] == 1
+    assert content["failed"] == 2
+    errors = content["data"][0]["errors"]
+    assert errors[0] == {"line": 2, "error": "row: not valid UTF-8"}
+    assert errors[1]["line"] == 3
+    assert "field larger than field limit" in errors[1]["error"]
+
+
+def test_import_items_chunk_error(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    lines = [json.dumps({"title": "Imported"}), json.dumps({"title": ""})]
+    with patch("app.crud.copy_items", side_effect=psycopg.DataError("boom")):
+        response = client.post(
+            f"{settings.API_V1_STR}/items/import",
+            headers=normal_user_token_headers,
+            files={"file": ("items.ndjson", "\n".join(lines))},
+        )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["imported"] == 0
+    assert content["failed"] == 2
+    errors = content["data"][0]["errors"]
+    assert errors[0] == {"line": 1, "error": "Chunk not imported: boom"}
+    assert errors[1]["line"] == 2
+
+
+def test_import_items_csv_from_export(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Round trip"},
+    )
+    params = {"format": "csv"}
+    exported = client.get(
+        f"{settings.API_V1_STR}/items/export",
+        headers=normal_user_token_headers,
+        params=params,
+    )
+    rows = list(csv.DictReader(io.StringIO(exported.text)))
+    response = client.post(
+        f"{settings.API_V1_STR}/items/import",
+        headers=normal_user_token_headers,
+        params=params,
+        files={"file": ("items.csv", exported.text)},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["imported"] == len(rows)
+    assert content["failed"] == 0
+
+
+def test_read_items_etag(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Polled"},
+    )
+    item_id = r.json()["id"]
+    url = f"{settings.API_V1_STR}/items/"
+    etag = client.get(url, headers=normal_user_token_headers).headers["etag"]
+    headers = {**normal_user_token_headers, "If-None-Match": etag}
+    assert client.get(url, headers=headers).status_code == 304
+
+    client.patch(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json={"data": [{"id": item_id, "description": "Changed"}]},
+    )
+    r = client.get(url, headers=headers)
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+
+    client.delete(
+        f"{settings.API_V1_STR}/items/{item_id}", headers=normal_user_token_headers
+    )
+    headers["If-None-Match"] = etag
+    assert client.get(url, headers=headers).status_code == 200
+
+
+def test_read_items_without_count(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"include_count": False},
+    )
+    assert response.status_code == 200
+    assert response.json()["count"] is None
+
+
+def test_read_items_filters(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    prefix = random_lower_string()
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers)
+    user_id = r.json()["id"]
+    before = datetime.now(timezone.utc).isoformat()
+    created_ids = []
+    for title in [f"{prefix} lamp", f"{prefix}-desk", f"x{prefix}"]:
+        r = client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+            json={"title": title},
+        )
+        created_ids.append(r.json()["id"])
+
+    def listed(headers: dict[str, str], **params: str) -> list[str]:
+        params["sort"] = "created_at"
+        r = client.get(f"{settings.API_V1_STR}/items/", headers=headers, params=params)
+        assert r.status_code == 200
+        assert r.json()["count"] is None
+        return [item["id"] for item in r.json()["data"]]
+
+    headers = normal_user_token_headers
+    assert listed(headers, title_prefix=prefix) == created_ids[:2]
+    assert listed(headers, title_prefix=prefix, created_after=before) == created_ids[:2]
+    assert listed(headers, title_prefix=prefix, created_before=before) == []
+    assert listed(headers, title_prefix=prefix, updated_after=before) == created_ids[:2]
+    assert listed(headers, title_prefix=f"{prefix} ") == created_ids[:1]
+
+    headers = superuser_token_headers
+    assert listed(headers, title_prefix=prefix, owner_id=user_id) == created_ids[:2]
+    assert listed(headers, title_prefix=prefix, owner_id=str(uuid.uuid4())) == []
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    other_owner = {"owner_id": r.json()["id"]}
+    assert listed(normal_user_token_headers, **other_owner) == []
+
+
+@pytest.mark.parametrize("sort", get_args(ItemSort))
+def test_read_items_sorted_with_cursor(
+    client: TestClient, normal_user_token_headers: dict[str, str], sort: str
+) -> None:
+    prefix = random_lower_string()
+    items = []
+    for title in ["b", "a", "c", "B", "é"]:
+        r = client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+            json={"title": f"{prefix} {title}"},
+        )
+        items.append(r.json())
+    # The first item becomes the last one updated
+    client.put(
+        f"{settings.API_V1_STR}/items/{items[0]['id']}",
+        headers=normal_user_token_headers,
+        json={"description": "Updated"},
+    )
+    expected = {
+        "created_at": items,
+        "updated_at": items[1:] + items[:1],
+        # Bytewise, uppercase letters come first
+        "title": sorted(items, key=lambda item: item["title"].encode()),
+    }[sort.removeprefix("-")]
+    if sort.startswith("-"):
+        expected = expected[::-1]
+
+    seen_ids: list[str] = []
+    params: dict[str, str | int] = {"title_prefix": prefix, "sort": sort, "limit": 2}
+    while True:
+        response = client.get(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+            params=params,
+        )
+        assert response.status_code == 200
+        content = response.json()
+        seen_ids.extend(item["id"] for item in content["data"])
+        if not content["next_cursor"]:
+            break
+        params["cursor"] = content["next_cursor"]
+
+    assert seen_ids == [item["id"] for item in expected]
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    ["not-a-cursor", encode_cursor(1, 2), encode_cursor(str(uuid.uuid4()))],
+)
+def test_read_items_invalid_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str], cursor: str
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"cursor": cursor},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_read_items_cursor_of_another_sort(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    create_random_item(db)
+    create_random_item(db)
+    url = f"{settings.API_V1_STR}/items/"
+    r = client.get(url, headers=superuser_token_headers, params={"limit": 1})
+    cursor = r.json()["next_cursor"]
+    for sort in ["title", "-created_at"]:
+        params = {"sort": sort, "cursor": cursor}
+        r = client.get(url, headers=superuser_token_headers, params=params)
+        assert r.status_code == 400
+        assert r.json()["detail"] == "Invalid cursor"
+
+
 def test_update_item(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -162,3 +701,114 @@ def test_delete_item_not_enough_permissions(
     assert response.status_code == 400
     content = response.json()
     assert content["detail"] == "Not enough permissions"
+
+
+def test_bulk_create_items(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers)
+    count = r.json()["count"]
+    data = [{"title": f"Bulk {i}"} for i in range(3)]
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json={"data": data},
+    )
+    assert response.status_code == 200
+    results = response.json()["data"]
+    assert [result["status"] for result in results] == ["created"] * 3
+    titles = [result["item"]["title"] for result in results]
+    assert titles == ["Bulk 0", "Bulk 1", "Bulk 2"]
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers)
+    assert r.json()["count"] == count + 3
+
+
+def test_bulk_update_items(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json={"data": [{"title": "A", "description": "a"}, {"title": "B"}]},
+    )
+    first, second = (result["id"] for result in response.json()["data"])
+    other_item = create_random_item(db)
+    response = client.patch(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json={
+            "data": [
+                {"id": first, "title": "A2"},
+                {"id": second, "description": "b2"},
+                {"id": str(other_item.id), "title": "Not mine"},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    results = response.json()["data"]
+    assert [result["status"] for result in results] == [
+        "updated",
+        "updated",
+        "not_found",
+    ]
+    assert results[0]["item"]["title"] == "A2"
+    assert results[0]["item"]["description"] == "a"
+    assert results[1]["item"]["title"] == "B"
+    assert results[1]["item"]["description"] == "b2"
+    db_item = db.get(Item, other_item.id)
+    assert db_item
+    assert db_item.title != "Not mine"
+
+
+def test_bulk_update_items_duplicate_ids(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    id = str(uuid.uuid4())
+    response = client.patch(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=superuser_token_headers,
+        json={"data": [{"id": id, "title": "A"}, {"id": id, "title": "B"}]},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Duplicate item ids"
+
+
+def test_bulk_delete_items(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json={"data": [{"title": "A"}, {"title": "B"}]},
+    )
+    ids = [result["id"] for result in response.json()["data"]]
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers)
+    count = r.json()["count"]
+    other_item = create_random_item(db)
+    response = client.request(
+        "DELETE",
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=normal_user_token_headers,
+        json={"ids": [*ids, str(other_item.id)]},
+    )
+    assert response.status_code == 200
+    results = response.json()["data"]
+    assert [result["status"] for result in results] == [
+        "deleted",
+        "deleted",
+        "not_found",
+    ]
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers)
+    assert r.json()["count"] == count - 2
+    assert db.get(Item, other_item.id)
+
+
+def test_bulk_create_items_too_many(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=superuser_token_headers,
+        json={"data": [{"title": "A"}] * (MAX_BULK_ITEMS + 1)},
+    )
+    assert response.status_code == 422
@@ -1,3 +1,4 @@
+import json
 import uuid
 from unittest.mock import patch
 
@@ -7,7 +8,8 @@ from sqlmodel import Session, select
 from app import crud
 from app.core.config import settings
 from app.core.security import verify_password
-from app.models import User, UserCreate
+from app.models import OutboxEmail, User, UserCreate
+from app.tests.utils.user import user_authentication_headers
 from app.tests.utils.utils import random_email, random_lower_string
 
 
@@ -37,7 +39,7 @@ def test_create_user_new_email(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
     with (
-        patch("app.utils.send_email", return_value=None),
+        patch("app.utils.send_email") as send_email,
         patch("app.core.config.settings.SMTP_HOST", "smtp.example.com"),
         patch("app.core.config.settings.SMTP_USER", "admin@example.com"),
     ):
@@ -54,6 +56,10 @@ def test_create_user_new_email(
         user = crud.get_user_by_email(session=db, email=username)
         assert user
         assert user.email == created_user["email"]
+        # Queued for the email worker instead of sent during the request
+        send_email.assert_not_called()
+        statement = select(OutboxEmail).where(OutboxEmail.email_to == username)
+        assert db.exec(statement).first()
 
 
 def test_get_existing_user(
@@ -168,6 +174,75 @@ def test_retrieve_users(
         assert "email" in item
 
 
+def test_retrieve_users_fast_responses(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    params = {"limit": 2}
+    r = client.get(
+        f"{settings.API_V1_STR}/users/", headers=superuser_token_headers, params=params
+    )
+    with patch("app.core.config.settings.FAST_LIST_RESPONSES", True):
+        fast = client.get(
+            f"{settings.API_V1_STR}/users/",
+            headers=superuser_token_headers,
+            params=params,
+        )
+    assert fast.status_code == 200
+    assert fast.headers["content-type"] == "application/json"
+    assert fast.json() == r.json()
+    assert "hashed_password" not in fast.json()["data"][0]
+
+
+def test_export_users(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    user = crud.create_user(session=db, user_create=user_in)
+    r = client.get(
+        f"{settings.API_V1_STR}/users/export", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert user.email in {row["email"] for row in rows}
+    assert "hashed_password" not in rows[0]
+
+
+def test_export_users_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/export", headers=normal_user_token_headers
+    )
+    assert r.status_code == 403
+
+
+def test_retrieve_users_with_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    for _ in range(2):
+        user_in = UserCreate(email=random_email(), password=random_lower_string())
+        crud.create_user(session=db, user_create=user_in)
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"limit": 1},
+    )
+    first_page = r.json()
+    assert len(first_page["data"]) == 1
+    assert first_page["next_cursor"]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"limit": 1, "cursor": first_page["next_cursor"]},
+    )
+    assert r.status_code == 200
+    second_page = r.json()
+    assert len(second_page["data"]) == 1
+    assert second_page["data"][0]["id"] > first_page["data"][0]["id"]
+
+
 def test_update_user_me(
     client: TestClient, normal_user_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -191,6 +266,57 @@ def test_update_user_me(
     assert user_db.full_name == full_name
 
 
+def test_read_user_me_etag(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/users/me"
+    etag = client.get(url, headers=normal_user_token_headers).headers["etag"]
+    headers = {**normal_user_token_headers, "If-None-Match": f'"other", {etag}'}
+    r = client.get(url, headers=headers)
+    assert r.status_code == 304
+    assert r.content == b""
+
+    client.patch(url, headers=normal_user_token_headers, json={"full_name": "New"})
+    r = client.get(url, headers=headers)
+    assert r.status_code == 200
+    assert r.json()["full_name"] == "New"
+    assert r.headers["etag"] != etag
+
+
+def test_update_user_me_after_cached_read(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    username = random_email()
+    password = random_lower_string()
+    user_in = UserCreate(email=username, password=password)
+    crud.create_user(session=db, user_create=user_in)
+    headers = user_authentication_headers(
+        client=client, email=username, password=password
+    )
+
+    client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/auth-cache/", headers=superuser_token_headers
+    )
+    hits = r.json()["hits"]
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.json()["full_name"] is None
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/auth-cache/", headers=superuser_token_headers
+    )
+    # The cached read, plus the superuser lookup for this stats request
+    assert r.json()["hits"] >= hits + 2
+
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/me",
+        headers=headers,
+        json={"full_name": "Cached Name"},
+    )
+    assert r.status_code == 200
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.json()["full_name"] == "Cached Name"
+
+
 def test_update_password_me(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -0,0 +1,25 @@
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+
+def test_read_db_pool_stats(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/db-pool/", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    stats = r.json()
+    assert stats["pool"] == "InstrumentedQueuePool"
+    assert stats["size"] == settings.DB_POOL_SIZE
+    assert {"checked_out", "overflow", "wait_seconds_total"} <= stats.keys()
+
+
+def test_read_db_pool_stats_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/db-pool/", headers=normal_user_token_headers
+    )
+    assert r.status_code == 403
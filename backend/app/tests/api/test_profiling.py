@@ -0,0 +1,83 @@
+import time
+from typing import Any
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.api.profiling import RequestProfile
+from app.core.config import settings
+
+
+def test_profile_speedscope(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    headers = {**superuser_token_headers, "X-Profile": "speedscope"}
+    with patch("app.core.config.settings.PROFILING_INTERVAL", 0.0001):
+        r = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert r.status_code == 200
+    assert r.headers["X-Profiled-Status"] == "200"
+    assert r.headers["Content-Disposition"] == (
+        'attachment; filename="items-read_items.speedscope.json"'
+    )
+    profile = r.json()
+    assert profile["$schema"] == "https://www.speedscope.app/file-format-schema.json"
+    # Sync endpoints run in the threadpool, they're profiled there
+    frames = {frame["name"] for frame in profile["shared"]["frames"]}
+    assert "read_items" in frames
+
+
+def test_profile_sync_endpoint_once(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    profiles: list[RequestProfile] = []
+    init = RequestProfile.__init__
+
+    def record(self: RequestProfile, *args: Any) -> None:
+        init(self, *args)
+        profiles.append(self)
+
+    headers = {**superuser_token_headers, "X-Profile": "speedscope"}
+    with patch.object(RequestProfile, "__init__", record):
+        start = time.perf_counter()
+        # Sync with DB_ASYNC too, unlike the item routes
+        r = client.get(f"{settings.API_V1_STR}/users/", headers=headers)
+        elapsed = time.perf_counter() - start
+    assert r.status_code == 200
+    # The event loop profiler starts first, then the one of the threadpool
+    # thread that ran the endpoint, once
+    [profile] = profiles
+    _, *thread_sessions = sorted(profile.sessions, key=lambda s: s.start_time)
+    assert len(thread_sessions) == 1
+    assert sum(session.duration for session in thread_sessions) <= elapsed
+
+
+def test_profile_html(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    headers = {**superuser_token_headers, "X-Profile": "html"}
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/html")
+
+
+def test_profile_not_superuser(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    headers = {**normal_user_token_headers, "X-Profile": "speedscope"}
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 403
+    assert r.json() == {"detail": "The user doesn't have enough privileges"}
+
+
+def test_profile_not_authenticated(client: TestClient) -> None:
+    headers = {"X-Profile": "speedscope"}
+    r = client.get(f"{settings.API_V1_STR}/utils/health-check/", headers=headers)
+    assert r.status_code == 401
+
+
+def test_profile_unknown_format(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    headers = {**superuser_token_headers, "X-Profile": "pstats"}
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 400
@@ -0,0 +1,90 @@
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.models import ItemCreate
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import MaxQueries
+
+BULK_ITEMS = 20
+
+# Most statements of each endpoint, including loading the current user when
+# they aren't in the auth cache yet. They don't depend on the number of rows
+ENDPOINT_QUERIES: list[tuple[str, str, int]] = [
+    ("GET", "/items/", 3),
+    ("GET", "/items/?include_count=true&sort=title", 3),
+    ("GET", "/items/?include_count=false&sort=title", 2),
+    ("GET", "/items/{item_id}", 2),
+    ("GET", "/items/search?q=item", 3),
+    ("POST", "/items/", 2),
+    ("PUT", "/items/{item_id}", 2),
+    ("DELETE", "/items/{item_id}", 3),
+    ("POST", "/items/bulk", 2),
+    ("PATCH", "/items/bulk", 3),
+    ("GET", "/users/", 3),
+    ("GET", "/users/me", 1),
+]
+
+
+@pytest.mark.parametrize("method,path,limit", ENDPOINT_QUERIES)
+def test_query_count(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+    max_queries: MaxQueries,
+    method: str,
+    path: str,
+    limit: int,
+) -> None:
+    owner = create_random_user(db)
+    items_in = [ItemCreate(title=f"Item {i}") for i in range(BULK_ITEMS)]
+    items = crud.create_items(session=db, items_in=items_in, owner_id=owner.id)
+    item_ids = [str(item.id) for item in items]
+    kwargs: dict[str, Any] = {}
+    if method in {"POST", "PUT"}:
+        kwargs["json"] = {"title": "Counted"}
+    if path == "/items/bulk":
+        data = [{"title": f"Counted {i}"} for i in range(BULK_ITEMS)]
+        if method == "PATCH":
+            data = [{"id": item_id, "title": "Counted"} for item_id in item_ids]
+        kwargs["json"] = {"data": data}
+    url = settings.API_V1_STR + path.format(item_id=item_ids[0])
+
+    with max_queries(limit):
+        r = client.request(method, url, headers=superuser_token_headers, **kwargs)
+    assert r.status_code == 200
+
+
+# Writes that build their response from RETURNING, once the auth cache knows
+# the user they are a single statement
+SINGLE_STATEMENT_WRITES: list[tuple[str, str, dict[str, Any]]] = [
+    ("POST", "/items/", {"json": {"title": "Returned"}}),
+    ("PUT", "/items/{item_id}", {"json": {"title": "Returned"}}),
+    ("PATCH", "/users/me", {"json": {"full_name": "Returned"}}),
+]
+
+
+@pytest.mark.parametrize("method,path,kwargs", SINGLE_STATEMENT_WRITES)
+def test_writes_are_single_statements(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    max_queries: MaxQueries,
+    method: str,
+    path: str,
+    kwargs: dict[str, Any],
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Written"},
+    )
+    url = settings.API_V1_STR + path.format(item_id=r.json()["id"])
+
+    with max_queries(1):
+        r = client.request(method, url, headers=normal_user_token_headers, **kwargs)
+    assert r.status_code == 200, r.text
+    assert r.json()[next(iter(kwargs["json"]))] == "Returned"
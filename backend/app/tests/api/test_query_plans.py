@@ -0,0 +1,306 @@
+import json
+from collections.abc import Generator, Iterator
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, get_args
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from sqlmodel import Session
+
+from app import crud
+from app.api.pagination import encode_cursor
+from app.core import security
+from app.core.config import settings
+from app.core.db import async_engine, engine
+from app.models import ItemSort
+
+# Enough rows that a sequential scan costs more than any index the planner has
+SEED_USERS = 2_000
+SEED_ITEMS = 50_000
+SEED_EMAIL_PATTERN = "query-plan-%@example.com"
+# Tables that grow with usage, the others are small enough to scan
+LARGE_TABLES = {"item", "user"}
+
+
+@pytest.fixture(scope="module")
+def seeded(db: Session) -> Generator[dict[str, str], None, None]:
+    db.execute(
+        text(
+            'INSERT INTO "user" (id, email, is_active, is_superuser, hashed_password) '
+            "SELECT gen_random_uuid(), 'query-plan-' || g || '@example.com', "
+            "true, false, 'x' FROM generate_series(1, :users) g"
+        ),
+        {"users": SEED_USERS},
+    )
+    db.execute(
+        text(
+            "INSERT INTO item (id, title, owner_id) "
+            "SELECT gen_random_uuid(), 'item ' || g, "
+            "owners.ids[1 + g % array_length(owners.ids, 1)] "
+            "FROM generate_series(1, :items) g, "
+            '(SELECT array_agg(id) AS ids FROM "user" WHERE email LIKE :pattern) owners'
+        ),
+        {"items": SEED_ITEMS, "pattern": SEED_EMAIL_PATTERN},
+    )
+    # Counted as crud counts the rows it inserts, the routes keep them up to date
+    owners = db.execute(
+        text(
+            'SELECT owner_id, count(*) FROM item JOIN "user" ON "user".id = owner_id '
+            "WHERE email LIKE :pattern GROUP BY owner_id"
+        ),
+        {"pattern": SEED_EMAIL_PATTERN},
+    ).all()
+    deltas = {crud.USER_COUNTER: SEED_USERS, crud.ITEM_COUNTER: SEED_ITEMS}
+    for owner_id, items in owners:
+        deltas[crud.owner_item_counter(owner_id)] = items
+    crud.increment_counters(session=db, deltas=deltas)
+    # Autovacuum merges the pending list of the new rows into the GIN index at
+    # some point, until then searches may be planned as sequential scans
+    db.execute(text("SELECT gin_clean_pending_list('ix_item_search_vector')"))
+    db.execute(text('ANALYZE item, "user"'))
+    db.commit()
+    row = db.execute(
+        text(
+            'SELECT item.id, item.owner_id FROM item JOIN "user" ON "user".id = owner_id '
+            "WHERE email LIKE :pattern LIMIT 1"
+        ),
+        {"pattern": SEED_EMAIL_PATTERN},
+    ).one()
+    other_item = db.execute(
+        text("SELECT id FROM item WHERE owner_id = :owner_id AND id != :id LIMIT 1"),
+        {"owner_id": row.owner_id, "id": row.id},
+    ).scalar_one()
+    other_user = db.execute(
+        text('SELECT id FROM "user" WHERE email LIKE :pattern AND id != :id LIMIT 1'),
+        {"pattern": SEED_EMAIL_PATTERN, "id": row.owner_id},
+    ).scalar_one()
+    yield {
+        "item_id": str(row.id),
+        "other_item_id": str(other_item),
+        "user_id": str(row.owner_id),
+        "other_user_id": str(other_user),
+    }
+    # Their items go with them, the foreign key cascades. Then they're counted
+    # out as crud.delete_user does
+    deleted = db.execute(
+        text('DELETE FROM "user" WHERE email LIKE :pattern RETURNING id'),
+        {"pattern": SEED_EMAIL_PATTERN},
+    ).scalars()
+    for user_id in deleted.all():
+        crud.forget_owner(session=db, owner_id=user_id)
+    db.commit()
+
+
+@pytest.fixture(scope="module")
+def seeded_owner_headers(seeded: dict[str, str]) -> dict[str, str]:
+    # The seeded users have no usable password, sign a token for one directly
+    token = security.create_access_token(seeded["user_id"], timedelta(minutes=10))
+    return {"Authorization": f"Bearer {token}"}
+
+
+@contextmanager
+def captured_statements() -> Iterator[list[tuple[str, Any]]]:
+    statements: list[tuple[str, Any]] = []
+
+    def before_cursor_execute(
+        _conn: Any,
+        _cursor: Any,
+        statement: str,
+        parameters: Any,
+        _context: Any,
+        executemany: bool,
+    ) -> None:
+        if not executemany:
+            statements.append((statement, parameters))
+
+    # The async routes of settings.DB_ASYNC go through the async engine
+    engines = [engine, async_engine.sync_engine]
+    for target in engines:
+        event.listen(target, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", before_cursor_execute)
+
+
+def seq_scans(plan: dict[str, Any]) -> Iterator[str]:
+    if plan["Node Type"] == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child)
+
+
+def index_names(plan: dict[str, Any]) -> Iterator[str]:
+    if "Index Name" in plan:
+        yield plan["Index Name"]
+    for child in plan.get("Plans", []):
+        yield from index_names(child)
+
+
+def explain(statement: str, parameters: Any) -> dict[str, Any]:
+    with engine.connect() as connection:
+        result = connection.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {statement}", parameters
+        )
+        plan = result.scalar_one()
+        connection.rollback()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]  # type: ignore[no-any-return]
+
+
+def large_table_seq_scans(statement: str, parameters: Any) -> list[str]:
+    plan = explain(statement, parameters)
+    return [name for name in seq_scans(plan) if name in LARGE_TABLES]
+
+
+# Routes of normal users, requested by the owner of item_id and by a superuser
+ITEM_REQUESTS = [
+    ("GET", "/items/", {}),
+    ("GET", "/items/", {"params": {"skip": 10, "include_count": False}}),
+    ("GET", "/items/", {"params": {"cursor": "{item_cursor}"}}),
+    ("GET", "/items/search", {"params": {"q": "item 4242"}}),
+    (
+        "GET",
+        "/items/search",
+        {"params": {"q": "4242 or 4243", "cursor": "{search_cursor}"}},
+    ),
+    ("GET", "/items/{item_id}", {}),
+    ("PUT", "/items/{item_id}", {"json": {"title": "Planned"}}),
+    ("PATCH", "/items/bulk", {"json": {"data": [{"id": "{item_id}", "title": "B"}]}}),
+    # Another item, both runs still need item_id
+    ("DELETE", "/items/bulk", {"json": {"ids": ["{other_item_id}"]}}),
+]
+SUPERUSER_REQUESTS = [
+    ("GET", "/users/", {}),
+    ("GET", "/users/", {"params": {"cursor": "{user_cursor}"}}),
+    ("GET", "/users/{user_id}", {}),
+    ("PATCH", "/users/{user_id}", {"json": {"full_name": "Planned"}}),
+    # Another user, the owner of item_id signs the requests of the later tests
+    ("DELETE", "/users/{other_user_id}", {}),
+]
+REQUESTS = [
+    *[(False, *request) for request in ITEM_REQUESTS + SUPERUSER_REQUESTS],
+    *[(True, *request) for request in ITEM_REQUESTS],
+]
+
+
+def fill(value: Any, ids: dict[str, str]) -> Any:
+    if isinstance(value, str):
+        return value.format(**ids)
+    if isinstance(value, list):
+        return [fill(v, ids) for v in value]
+    if isinstance(value, dict):
+        return {k: fill(v, ids) for k, v in value.items()}
+    return value
+
+
+@pytest.mark.parametrize(
+    "owner,method,path,kwargs",
+    REQUESTS,
+    ids=[f"{'owner' if o else 'superuser'} {m} {p}" for o, m, p, _ in REQUESTS],
+)
+def test_no_seq_scan_on_large_tables(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    seeded_owner_headers: dict[str, str],
+    seeded: dict[str, str],
+    owner: bool,
+    method: str,
+    path: str,
+    kwargs: dict[str, Any],
+) -> None:
+    # Normal users go through the owner_id scoped statements
+    headers = seeded_owner_headers if owner else superuser_token_headers
+    r = client.get(
+        f"{settings.API_V1_STR}/items/", headers=headers, params={"limit": 10}
+    )
+    item_cursor = r.json()["next_cursor"]
+    r = client.get(f"{settings.API_V1_STR}/users/", headers=superuser_token_headers)
+    user_cursor = r.json()["next_cursor"]
+    search_cursor = encode_cursor(1.0, seeded["item_id"])
+    ids = {
+        **seeded,
+        "item_cursor": item_cursor,
+        "user_cursor": user_cursor,
+        "search_cursor": search_cursor,
+    }
+
+    with captured_statements() as statements:
+        r = client.request(
+            method,
+            f"{settings.API_V1_STR}{fill(path, ids)}",
+            headers=headers,
+            **fill(kwargs, ids),
+        )
+    assert r.status_code == 200, r.text
+    assert_no_seq_scans(statements)
+
+
+# Every sort order of GET /items/ with each kind of filter, on the first page and
+# on the page after it
+ITEM_SORTS = [None, *get_args(ItemSort)]
+ITEM_FILTERS = [
+    {},
+    {"owner_id": "{user_id}"},
+    {"title_prefix": "item 42"},
+    {"created_after": "2000-01-01T00:00:00Z"},
+    {"updated_before": "2000-01-01T00:00:00Z"},
+]
+
+
+@pytest.mark.parametrize("owner", [False, True], ids=["superuser", "owner"])
+@pytest.mark.parametrize("filters", ITEM_FILTERS, ids=str)
+@pytest.mark.parametrize("sort", ITEM_SORTS, ids=str)
+def test_item_sorts_and_filters_use_indexes(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    seeded_owner_headers: dict[str, str],
+    seeded: dict[str, str],
+    sort: str | None,
+    filters: dict[str, str],
+    owner: bool,
+) -> None:
+    # Normal users only list their own items, without asking for owner_id
+    headers = seeded_owner_headers if owner else superuser_token_headers
+    params = {**fill(filters, seeded), "include_count": False, "limit": 20}
+    if sort:
+        params["sort"] = sort
+    for _ in range(2):
+        with captured_statements() as statements:
+            r = client.get(
+                f"{settings.API_V1_STR}/items/", headers=headers, params=params
+            )
+        assert r.status_code == 200, r.text
+        assert_no_seq_scans(statements)
+        # No item was updated before 2000, the updated_at index finds that first
+        if owner and "updated_before" not in filters:
+            assert_owner_index_used(statements)
+        if not r.json()["next_cursor"]:
+            break
+        params["cursor"] = r.json()["next_cursor"]
+
+
+def assert_no_seq_scans(statements: list[tuple[str, Any]]) -> None:
+    explained = [
+        s
+        for s in statements
+        if s[0].lstrip().startswith(("SELECT", "UPDATE", "DELETE"))
+    ]
+    assert explained
+    for statement, parameters in explained:
+        assert not large_table_seq_scans(statement, parameters), statement
+
+
+def assert_owner_index_used(statements: list[tuple[str, Any]]) -> None:
+    listed = [s for s in statements if s[0].lstrip().startswith("SELECT item.")]
+    assert listed
+    for statement, parameters in listed:
+        indexes = set(index_names(explain(statement, parameters)))
+        assert any(name.startswith("ix_item_owner_id_") for name in indexes), (
+            statement,
+            indexes,
+        )
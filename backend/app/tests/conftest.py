@@ -1,15 +1,18 @@
-from collections.abc import Generator
+from collections.abc import Generator, Iterator
+from contextlib import contextmanager
+from typing import Any
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlmodel import Session, delete
 
 from app.core.config import settings
-from app.core.db import engine, init_db
+from app.core.db import async_engine, engine, init_db
 from app.main import app
-from app.models import Item, User
+from app.models import Counter, Item, OutboxEmail, User
 from app.tests.utils.user import authentication_token_from_email
-from app.tests.utils.utils import get_superuser_token_headers
+from app.tests.utils.utils import MaxQueries, get_superuser_token_headers
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -21,6 +24,10 @@ def db() -> Generator[Session, None, None]:
         session.execute(statement)
         statement = delete(User)
         session.execute(statement)
+        statement = delete(Counter)
+        session.execute(statement)
+        statement = delete(OutboxEmail)
+        session.execute(statement)
         session.commit()
 
 
@@ -40,3 +47,38 @@ def normal_user_token_headers(client: TestClient, db: Session) -> dict[str, str]
     return authentication_token_from_email(
         client=client, email=settings.EMAIL_TEST_USER, db=db
     )
+
+
+@pytest.fixture
+def max_queries() -> MaxQueries:
+    """
+    Fail when the block runs more than `limit` statements, to catch N+1s:
+
+        with max_queries(3):
+            client.get(...)
+    """
+
+    @contextmanager
+    def check(limit: int) -> Iterator[list[str]]:
+        statements: list[str] = []
+
+        def before_cursor_execute(
+            _conn: Any, _cursor: Any, statement: str, *_: Any
+        ) -> None:
+            statements.append(statement)
+
+        # The async routes of settings.DB_ASYNC go through the async engine
+        engines = [engine, async_engine.sync_engine]
+        for target in engines:
+            event.listen(target, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            for target in engines:
+                event.remove(target, "before_cursor_execute", before_cursor_execute)
+        listing = "\n".join(statements)
+        assert (
+            len(statements) <= limit
+        ), f"{len(statements)} queries, expected at most {limit}:\n{listing}"
+
+    return check
@@ -0,0 +1,118 @@
+import time
+import uuid
+from datetime import timedelta
+from typing import Any
+from unittest.mock import patch
+
+from sqlmodel import Session, func, select
+
+from app.api.deps import get_current_user
+from app.core.cache import (
+    WRITE_NOTIFICATION,
+    InvalidationListener,
+    TTLCache,
+    invalidate_user,
+    recent_writers,
+    user_cache,
+    wrote_recently,
+)
+from app.core.security import create_access_token
+from app.tests.utils.user import create_random_user
+
+
+def test_ttl_cache_evicts_least_recently_used() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {"hits": 3, "misses": 1, "size": 2, "maxsize": 2}
+
+
+def test_ttl_cache_expires_entries() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    with patch("app.core.cache.time.monotonic", return_value=time.monotonic() + 11):
+        assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_ttl_cache_skips_values_loaded_before_an_invalidation() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    version = cache.version
+    cache.invalidate("a")
+    cache.set("a", 1, version=version)
+    assert cache.get("a") is None
+    cache.set("a", 2, version=cache.version)
+    assert cache.get("a") == 2
+
+
+def test_get_current_user_skips_caching_a_stale_row(db: Session) -> None:
+    user = create_random_user(db)
+    token = create_access_token(user.id, timedelta(minutes=1))
+    load = db.get
+
+    def get_then_change(*args: Any, **kwargs: Any) -> Any:
+        row = load(*args, **kwargs)
+        # Another request commits a change to the user after it was read
+        user_cache.invalidate(str(user.id))
+        return row
+
+    with patch.object(db, "get", get_then_change):
+        assert get_current_user(db, token).id == user.id
+    assert user_cache.get(str(user.id)) is None
+    get_current_user(db, token)
+    cached = user_cache.get(str(user.id))
+    assert cached and cached["email"] == user.email
+    assert "hashed_password" not in cached
+
+
+def test_invalidate_user_on_commit(db: Session) -> None:
+    user_id = uuid.uuid4()
+    user_cache.set(str(user_id), {"id": user_id})
+    invalidate_user(session=db, user_id=user_id)
+    assert user_cache.get(str(user_id))
+    db.commit()
+    assert user_cache.get(str(user_id)) is None
+
+
+def test_invalidation_listener(db: Session) -> None:
+    user_id = str(uuid.uuid4())
+    with patch("app.core.config.settings.AUTH_CACHE_CHANNEL", "test_auth_cache"):
+        listener = InvalidationListener()
+        listener.start()
+        try:
+            time.sleep(0.5)
+            user_cache.set(user_id, {"id": user_id})
+            db.exec(select(func.pg_notify("test_auth_cache", user_id)))
+            db.commit()
+            for _ in range(50):
+                if user_cache.get(user_id) is None:
+                    break
+                time.sleep(0.1)
+            assert user_cache.get(user_id) is None
+        finally:
+            listener.stop()
+
+
+def test_invalidation_listener_records_writes(db: Session) -> None:
+    user_id = uuid.uuid4()
+    with patch("app.core.config.settings.AUTH_CACHE_CHANNEL", "test_auth_cache"):
+        listener = InvalidationListener()
+        listener.start()
+        try:
+            time.sleep(0.5)
+            payload = f"{WRITE_NOTIFICATION}{user_id}"
+            db.exec(select(func.pg_notify("test_auth_cache", payload)))
+            db.commit()
+            for _ in range(50):
+                if wrote_recently(user_id):
+                    break
+                time.sleep(0.1)
+            assert wrote_recently(user_id)
+        finally:
+            listener.stop()
+            recent_writers.clear()
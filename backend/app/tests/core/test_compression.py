@@ -0,0 +1,106 @@
+import asyncio
+import gzip
+import zlib
+from collections.abc import AsyncIterator
+from typing import Any
+
+import brotli  # type: ignore[import-untyped]
+import zstandard
+from starlette.responses import Response, StreamingResponse
+from starlette.types import ASGIApp, Message
+
+from app.core.compression import CompressionMiddleware, choose_encoding
+
+BODY = b'{"title": "Item", "description": "Compressible"}' * 100
+
+
+def request(
+    app: ASGIApp, accept_encoding: str, method: str = "GET"
+) -> tuple[dict[str, str], list[bytes]]:
+    """
+    Response headers and body chunks, as sent by `app` wrapped in the middleware.
+    """
+    middleware = CompressionMiddleware(
+        app, encodings=["zstd", "br", "gzip"], minimum_size=1024
+    )
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": "/",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    messages: list[Message] = []
+
+    async def receive() -> Message:
+        # The client never disconnects
+        await asyncio.Event().wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    headers = {k.decode(): v.decode() for k, v in messages[0]["headers"]}
+    return headers, [message["body"] for message in messages[1:]]
+
+
+def json_app(body: bytes) -> ASGIApp:
+    return Response(body, media_type="application/json")
+
+
+def test_choose_encoding() -> None:
+    encodings = ["zstd", "br", "gzip"]
+    assert choose_encoding("gzip, deflate, br", encodings) == "br"
+    assert choose_encoding("gzip;q=0.5, zstd;q=0", encodings) == "gzip"
+    assert choose_encoding("*", encodings) == "zstd"
+    assert choose_encoding("deflate", encodings) is None
+    assert choose_encoding("", encodings) is None
+
+
+def test_compress_gzip() -> None:
+    headers, chunks = request(json_app(BODY), "gzip")
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(chunks[0]) < len(BODY)
+    assert gzip.decompress(chunks[0]) == BODY
+
+
+def test_compress_brotli_and_zstd() -> None:
+    headers, chunks = request(json_app(BODY), "br")
+    assert headers["content-encoding"] == "br"
+    assert brotli.decompress(chunks[0]) == BODY
+    headers, chunks = request(json_app(BODY), "zstd, br, gzip")
+    assert headers["content-encoding"] == "zstd"
+    assert zstandard.ZstdDecompressor().decompressobj().decompress(chunks[0]) == BODY
+
+
+def test_skip_small_and_incompressible_responses() -> None:
+    headers, chunks = request(json_app(b"{}"), "gzip")
+    assert "content-encoding" not in headers
+    assert headers["vary"] == "Accept-Encoding"
+    assert chunks == [b"{}"]
+
+    headers, chunks = request(Response(BODY, media_type="image/png"), "gzip")
+    assert "content-encoding" not in headers
+    assert chunks == [BODY]
+
+    headers, chunks = request(json_app(BODY), "identity")
+    assert "content-encoding" not in headers
+
+
+def test_compress_streaming_response() -> None:
+    async def lines() -> AsyncIterator[bytes]:
+        for i in range(3):
+            yield f'{{"line": {i}}}\n'.encode()
+
+    def app(*args: Any) -> Any:
+        return StreamingResponse(lines(), media_type="application/x-ndjson")(*args)
+
+    headers, chunks = request(app, "gzip")
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    # Each line is flushed as it comes, nothing is buffered until the end
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    received = [decompressor.decompress(chunk) for chunk in chunks]
+    assert received[:3] == [b'{"line": 0}\n', b'{"line": 1}\n', b'{"line": 2}\n']
+    assert b"".join(received) == b'{"line": 0}\n{"line": 1}\n{"line": 2}\n'
@@ -0,0 +1,57 @@
+import time
+from unittest.mock import patch
+
+from sqlalchemy import NullPool
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.db import (
+    InstrumentedQueuePool,
+    ReplicaRouter,
+    engine,
+    engine_options,
+    pool_stats,
+)
+
+
+def test_engine_options() -> None:
+    options = engine_options()
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_pre_ping"] is True
+    assert "poolclass" not in engine_options(is_async=True)
+
+
+def test_engine_options_pgbouncer() -> None:
+    with patch("app.core.config.settings.DB_PGBOUNCER", True):
+        options = engine_options()
+    assert options["poolclass"] is NullPool
+    assert options["connect_args"] == {"prepare_threshold": None}
+
+
+def test_pool_stats() -> None:
+    checkouts = pool_stats()["checkouts"]
+    with Session(engine) as session:
+        session.exec(select(1))
+        stats = pool_stats()
+        assert stats["checked_out"] >= 1
+    stats = pool_stats()
+    assert stats["checkouts"] == checkouts + 1
+    assert stats["wait_seconds_max"] >= 0
+
+
+def test_replica_router_round_robin() -> None:
+    router = ReplicaRouter(["a", "b", "c"])
+    assert router.candidates() == ["a", "b", "c"]
+    assert router.candidates() == ["b", "c", "a"]
+    assert router.candidates() == ["c", "a", "b"]
+    assert ReplicaRouter([]).candidates() == []
+
+
+def test_replica_router_skips_failed_replicas() -> None:
+    router = ReplicaRouter(["a", "b"])
+    router.mark_down("a")
+    assert router.candidates() == ["b"]
+    assert router.candidates() == ["b"]
+    later = time.monotonic() + settings.DB_REPLICA_RETRY_SECONDS + 1
+    with patch("app.core.db.time.monotonic", return_value=later):
+        assert router.candidates() == ["a", "b"]
@@ -0,0 +1,75 @@
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+
+from app.core.config import settings
+
+
+def sample(name: str, **labels: str) -> float | None:
+    return REGISTRY.get_sample_value(name, labels)
+
+
+def test_request_metrics(client: TestClient) -> None:
+    labels = {"operation": "utils-health_check"}
+    before = sample("http_request_duration_seconds_count", **labels) or 0
+    r = client.get(f"{settings.API_V1_STR}/utils/health-check/")
+    assert r.status_code == 200
+    assert sample("http_request_duration_seconds_count", **labels) == before + 1
+    assert sample("http_requests_total", **labels, status="200")
+    assert sample("http_requests_in_progress") == 0
+
+    client.get("/not-a-route")
+    assert sample("http_requests_total", operation="unmatched", status="404")
+
+
+def test_db_pool_metrics(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers)
+    assert r.status_code == 200
+    opened = sample("db_pool_connections", engine="primary", state="open")
+    assert opened and opened >= 1
+    assert sample("db_pool_connections", engine="primary", state="checked_out") == 0
+
+
+def test_metrics_endpoint(client: TestClient) -> None:
+    client.get(f"{settings.API_V1_STR}/utils/health-check/")
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_bucket{le="0.005",operation=' in r.text
+    assert "password_hash_pending" in r.text
+
+
+def test_metrics_token(client: TestClient) -> None:
+    with patch("app.core.config.settings.METRICS_TOKEN", "scraper"):
+        assert client.get("/metrics").status_code == 401
+        headers = {"Authorization": "Bearer scraper"}
+        assert client.get("/metrics", headers=headers).status_code == 200
+
+
+WORKER = """
+from app.core import metrics
+metrics.REQUEST_DURATION.labels("items-read_items").observe(0.2)
+metrics.REQUESTS_IN_PROGRESS.inc()
+if {exited}:
+    metrics.mark_process_dead()
+"""
+
+
+def test_metrics_add_up_across_processes(tmp_path: Path) -> None:
+    env = {"PROMETHEUS_MULTIPROC_DIR": str(tmp_path), "PYTHONPATH": "."}
+    for exited in [False, False, True]:
+        code = WORKER.format(exited=exited)
+        subprocess.run([sys.executable, "-c", code], env=env, check=True)
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=str(tmp_path))  # type: ignore[no-untyped-call]
+    labels = {"operation": "items-read_items"}
+    assert registry.get_sample_value("http_request_duration_seconds_count", labels) == 3
+    # Gone from the gauge once it's marked as dead
+    assert registry.get_sample_value("http_requests_in_progress") == 2
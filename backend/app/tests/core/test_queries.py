@@ -0,0 +1,64 @@
+import logging
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.queries import QueryStats, current_stats
+
+
+def test_server_timing(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    with patch("app.core.config.settings.SERVER_TIMING", True):
+        r = client.get(
+            f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers
+        )
+    timing = r.headers["Server-Timing"]
+    assert timing.startswith("db;dur=")
+    assert timing.endswith(' queries"')
+    with patch("app.core.config.settings.SERVER_TIMING", False):
+        r = client.get(f"{settings.API_V1_STR}/utils/health-check/")
+    assert "Server-Timing" not in r.headers
+
+
+def test_query_stats() -> None:
+    stats = QueryStats()
+    token = current_stats.set(stats)
+    try:
+        with Session(engine) as session:
+            for _ in range(3):
+                session.exec(select(1))
+    finally:
+        current_stats.reset(token)
+    assert stats.count == 3
+    assert stats.seconds > 0
+    repeated = stats.most_repeated()
+    assert repeated and repeated[1] == 3
+
+
+def test_slow_query_log(caplog: pytest.LogCaptureFixture) -> None:
+    with (
+        patch("app.core.config.settings.SQL_SLOW_QUERY_SECONDS", 1e-9),
+        Session(engine) as session,
+        caplog.at_level(logging.WARNING, logger="app.core.queries"),
+    ):
+        session.exec(select(1).where(select(2).scalar_subquery() == 2))
+    assert "slow query" in caplog.text
+    assert "parameters: {'param_1': 2" in caplog.text
+
+
+def test_repeated_query_log(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    with (
+        patch("app.core.config.settings.SQL_REPEATED_QUERY_WARNING", 1),
+        caplog.at_level(logging.WARNING, logger="app.core.queries"),
+    ):
+        client.get(f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers)
+    assert f"GET {settings.API_V1_STR}/items/ ran the same query" in caplog.text
@@ -0,0 +1,37 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import security
+from app.core.config import settings
+
+
+def test_password_hash_roundtrip() -> None:
+    hashed_password = security.get_password_hash("a-secret-password")
+    assert security.verify_password("a-secret-password", hashed_password)
+    assert not security.verify_password("another-password", hashed_password)
+
+
+def test_password_hash_inline() -> None:
+    with patch("app.core.config.settings.PASSWORD_HASH_WORKERS", 0):
+        hashed_password = security.get_password_hash("a-secret-password")
+        assert security.verify_password("a-secret-password", hashed_password)
+
+
+def test_password_hasher_busy() -> None:
+    with patch("app.core.config.settings.PASSWORD_HASH_MAX_PENDING", 0):
+        with pytest.raises(security.PasswordHasherBusyError):
+            security.get_password_hash("a-secret-password")
+    assert security.password_hasher_pending() == 0
+
+
+def test_login_when_password_hasher_busy(client: TestClient) -> None:
+    login_data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    with patch("app.core.config.settings.PASSWORD_HASH_MAX_PENDING", 0):
+        r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
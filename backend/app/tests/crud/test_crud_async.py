@@ -0,0 +1,69 @@
+from collections.abc import AsyncGenerator
+
+import pytest
+from sqlalchemy import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import crud, crud_async
+from app.core.config import settings
+from app.models import ItemBulkUpdate, ItemCreate
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import random_lower_string
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+async def async_db() -> AsyncGenerator[AsyncSession, None]:
+    # A pool per test, async connections can't be shared across event loops
+    engine = create_async_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI), poolclass=NullPool
+    )
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.anyio
+async def test_create_and_delete_item(db: Session, async_db: AsyncSession) -> None:
+    user = create_random_user(db)
+    item_in = ItemCreate(title=random_lower_string())
+    item = await crud_async.create_item(
+        session=async_db, item_in=item_in, owner_id=user.id
+    )
+    assert item.owner_id == user.id
+    counter = crud.owner_item_counter(user.id)
+    assert await crud_async.get_counter(session=async_db, name=counter) == 1
+
+    await crud_async.delete_item(session=async_db, db_item=item)
+    assert await crud_async.get_counter(session=async_db, name=counter) == 0
+
+
+@pytest.mark.anyio
+async def test_bulk_items(db: Session, async_db: AsyncSession) -> None:
+    user = create_random_user(db)
+    items_in = [ItemCreate(title=random_lower_string()) for _ in range(3)]
+    items = await crud_async.create_items(
+        session=async_db, items_in=items_in, owner_id=user.id
+    )
+    assert [item.title for item in items] == [item.title for item in items_in]
+    counter = crud.owner_item_counter(user.id)
+    assert await crud_async.get_counter(session=async_db, name=counter) == 3
+
+    updates = [ItemBulkUpdate(id=items[0].id, description="updated")]
+    updated = await crud_async.update_items(
+        session=async_db, items_in=updates, owner_id=user.id
+    )
+    assert [(item.id, item.description) for item in updated] == [
+        (items[0].id, "updated")
+    ]
+
+    ids = [item.id for item in items]
+    deleted = await crud_async.delete_items(session=async_db, ids=ids)
+    assert sorted(deleted) == sorted(ids)
+    assert await crud_async.get_counter(session=async_db, name=counter) == 0
@@ -1,9 +1,9 @@
 from fastapi.encoders import jsonable_encoder
-from sqlmodel import Session
+from sqlmodel import Session, col, select
 
 from app import crud
 from app.core.security import verify_password
-from app.models import User, UserCreate, UserUpdate
+from app.models import Item, ItemCreate, User, UserCreate, UserUpdate
 from app.tests.utils.utils import random_email, random_lower_string
 
 
@@ -89,3 +89,24 @@ def test_update_user(db: Session) -> None:
     assert user_2
     assert user.email == user_2.email
     assert verify_password(new_password, user_2.hashed_password)
+
+
+def test_user_counter(db: Session) -> None:
+    count = crud.get_counter(session=db, name=crud.USER_COUNTER)
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    user = crud.create_user(session=db, user_create=user_in)
+    assert crud.get_counter(session=db, name=crud.USER_COUNTER) == count + 1
+    crud.delete_user(session=db, db_user=user)
+    assert crud.get_counter(session=db, name=crud.USER_COUNTER) == count
+
+
+def test_delete_user_with_items(db: Session) -> None:
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    user = crud.create_user(session=db, user_create=user_in)
+    items_in = [ItemCreate(title=random_lower_string()) for _ in range(3)]
+    crud.create_items(session=db, items_in=items_in, owner_id=user.id)
+    total = crud.get_counter(session=db, name=crud.ITEM_COUNTER)
+    assert crud.delete_user(session=db, db_user=user)
+    # Deleted by the foreign key, not by the ORM
+    assert not db.exec(select(Item).where(col(Item.owner_id) == user.id)).all()
+    assert crud.get_counter(session=db, name=crud.ITEM_COUNTER) == total - 3
@@ -0,0 +1,126 @@
+import socket
+from collections.abc import Generator
+from datetime import datetime, timezone
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from aiosmtpd.controller import Controller
+from emails.backend.smtp import SMTPBackend  # type: ignore
+from prometheus_client import REGISTRY
+from sqlmodel import Session, delete, select
+
+from app.core.config import settings
+from app.email_worker import deliver_batch, retry_delay
+from app.models import OutboxEmail
+from app.utils import queue_email
+
+
+class Inbox:
+    def __init__(self) -> None:
+        self.messages: list[Any] = []
+
+    async def handle_DATA(self, server: Any, session: Any, envelope: Any) -> str:
+        self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+def unused_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port: int = s.getsockname()[1]
+        return port
+
+
+@pytest.fixture
+def inbox() -> Generator[tuple[Inbox, int], None, None]:
+    handler = Inbox()
+    port = unused_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        yield handler, port
+    finally:
+        controller.stop()
+
+
+@pytest.fixture
+def outbox(db: Session) -> Generator[None, None, None]:
+    db.exec(delete(OutboxEmail))  # type: ignore
+    db.commit()
+    with (
+        patch("app.core.config.settings.SMTP_HOST", "127.0.0.1"),
+        patch("app.core.config.settings.EMAILS_FROM_EMAIL", "info@example.com"),
+    ):
+        yield
+    db.exec(delete(OutboxEmail))  # type: ignore
+    db.commit()
+
+
+@pytest.mark.usefixtures("outbox")
+def test_deliver_batch(db: Session, inbox: tuple[Inbox, int]) -> None:
+    handler, port = inbox
+    recipients = [f"user{i}@example.com" for i in range(3)]
+    for email_to in recipients:
+        queue_email(session=db, email_to=email_to, subject="Hi", html_content="<p>")
+
+    sent = REGISTRY.get_sample_value("emails_sent_total") or 0
+    with (
+        patch("app.core.config.settings.EMAIL_OUTBOX_BATCH_SIZE", 2),
+        SMTPBackend(host="127.0.0.1", port=port, fail_silently=True) as smtp,
+    ):
+        assert deliver_batch(session=db, smtp=smtp) == 2
+        assert deliver_batch(session=db, smtp=smtp) == 1
+        assert deliver_batch(session=db, smtp=smtp) == 0
+
+    assert sorted(m.rcpt_tos[0] for m in handler.messages) == recipients
+    assert REGISTRY.get_sample_value("emails_sent_total") == sent + 3
+    assert not db.exec(select(OutboxEmail)).all()
+
+
+@pytest.mark.usefixtures("outbox")
+def test_deliver_batch_retries_later(db: Session) -> None:
+    queue_email(
+        session=db, email_to="user@example.com", subject="Hi", html_content="<p>"
+    )
+    start = datetime.now(timezone.utc)
+    failures = REGISTRY.get_sample_value("email_send_failures_total") or 0
+
+    with SMTPBackend(host="127.0.0.1", port=unused_port(), fail_silently=True) as smtp:
+        assert deliver_batch(session=db, smtp=smtp) == 1
+        # Not due again until the retry delay has passed
+        assert deliver_batch(session=db, smtp=smtp) == 0
+    assert REGISTRY.get_sample_value("email_send_failures_total") == failures + 1
+
+    email = db.exec(select(OutboxEmail)).one()
+    db.refresh(email)
+    assert email.attempts == 1
+    assert email.last_error
+    assert email.next_attempt_at >= start + retry_delay(1)
+
+
+@pytest.mark.usefixtures("outbox")
+def test_deliver_batch_server_down(db: Session) -> None:
+    for i in range(3):
+        queue_email(
+            session=db,
+            email_to=f"user{i}@example.com",
+            subject="Hi",
+            html_content="<p>",
+        )
+
+    # Stops at the first email, the worker sleeps instead of retrying at once
+    with (
+        patch("app.core.config.settings.EMAIL_OUTBOX_BATCH_SIZE", 2),
+        SMTPBackend(host="127.0.0.1", port=unused_port(), fail_silently=True) as smtp,
+    ):
+        assert deliver_batch(session=db, smtp=smtp) == 1
+    attempts = db.exec(select(OutboxEmail.attempts)).all()
+    assert sorted(attempts) == [0, 0, 1]
+
+
+def test_retry_delay() -> None:
+    base = settings.EMAIL_OUTBOX_RETRY_SECONDS
+    assert retry_delay(1).total_seconds() == base
+    assert retry_delay(3).total_seconds() == base * 4
+    assert retry_delay(100).total_seconds() == 3600
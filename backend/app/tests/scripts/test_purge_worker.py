@@ -0,0 +1,56 @@
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, col, func, select
+
+from app import crud
+from app.core.config import settings
+from app.models import Item, ItemCreate, User, UserCreate, UserPurge
+from app.purge_worker import purge_batch
+from app.tests.utils.user import user_authentication_headers
+from app.tests.utils.utils import random_email, random_lower_string
+
+
+def test_purge_large_user(client: TestClient, db: Session) -> None:
+    email, password = random_email(), random_lower_string()
+    user = crud.create_user(
+        session=db, user_create=UserCreate(email=email, password=password)
+    )
+    user_id = user.id
+    items_in = [ItemCreate(title=random_lower_string()) for _ in range(5)]
+    crud.create_items(session=db, items_in=items_in, owner_id=user_id)
+    total = crud.get_counter(session=db, name=crud.ITEM_COUNTER)
+    users = crud.get_counter(session=db, name=crud.USER_COUNTER)
+    headers = user_authentication_headers(client=client, email=email, password=password)
+
+    with patch("app.core.config.settings.USER_PURGE_INLINE_ITEMS", 2):
+        r = client.delete(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["message"] == "User deactivated, their items are being deleted"
+    db.expire_all()
+    user_db = db.get(User, user_id)
+    assert user_db
+    assert not user_db.is_active
+    assert db.get(UserPurge, user_id)
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 400
+
+    def remaining() -> int:
+        statement = select(func.count()).where(col(Item.owner_id) == user_id)
+        return db.exec(statement).one()
+
+    with patch("app.core.config.settings.USER_PURGE_BATCH_SIZE", 2):
+        assert purge_batch(session=db) == 2
+        assert remaining() == 3
+        assert crud.get_counter(session=db, name=crud.ITEM_COUNTER) == total - 2
+        assert purge_batch(session=db) == 2
+        assert purge_batch(session=db) == 1
+        assert purge_batch(session=db) == 0
+
+    db.expire_all()
+    assert remaining() == 0
+    assert not db.get(User, user_id)
+    assert not db.get(UserPurge, user_id)
+    assert crud.get_counter(session=db, name=crud.ITEM_COUNTER) == total - 5
+    assert crud.get_counter(session=db, name=crud.USER_COUNTER) == users - 1
+    assert crud.get_counter(session=db, name=crud.owner_item_counter(user_id)) == 0
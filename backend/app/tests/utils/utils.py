@@ -1,10 +1,16 @@
 import random
 import string
+from collections.abc import Callable
+from contextlib import AbstractContextManager
 
 from fastapi.testclient import TestClient
 
 from app.core.config import settings
 
+# The max_queries fixture, a context manager that fails the test when more
+# statements than the limit run within it, and yields them
+MaxQueries = Callable[[int], AbstractContextManager[list[str]]]
+
 
 def random_lower_string() -> str:
     return "".join(random.choices(string.ascii_lowercase, k=32))
@@ -6,11 +6,13 @@ from typing import Any
 
 import emails  # type: ignore
 import jwt
-from jinja2 import Template
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from jwt.exceptions import InvalidTokenError
+from sqlmodel import Session
 
 from app.core import security
 from app.core.config import settings
+from app.models import OutboxEmail
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -22,37 +24,81 @@ class EmailData:
     subject: str
 
 
+# Compiled templates are kept in memory, and in a bytecode cache on disk that
+# other processes reuse. Only local development checks the files for changes.
+email_templates = Environment(
+    loader=FileSystemLoader(Path(__file__).parent / "email-templates" / "build"),
+    bytecode_cache=FileSystemBytecodeCache(),
+    auto_reload=settings.ENVIRONMENT == "local",
+)
+
+
+def load_email_templates() -> None:
+    """
+    Compile all the email templates, so the first emails don't pay for it.
+    """
+    for template_name in email_templates.list_templates():
+        email_templates.get_template(template_name)
+
+
 def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
-    template_str = (
-        Path(__file__).parent / "email-templates" / "build" / template_name
-    ).read_text()
-    html_content = Template(template_str).render(context)
+    html_content = email_templates.get_template(template_name).render(context)
     return html_content
 
 
+def get_smtp_options() -> dict[str, Any]:
+    smtp_options: dict[str, Any] = {
+        "host": settings.SMTP_HOST,
+        "port": settings.SMTP_PORT,
+    }
+    if settings.SMTP_TLS:
+        smtp_options["tls"] = True
+    elif settings.SMTP_SSL:
+        smtp_options["ssl"] = True
+    if settings.SMTP_USER:
+        smtp_options["user"] = settings.SMTP_USER
+    if settings.SMTP_PASSWORD:
+        smtp_options["password"] = settings.SMTP_PASSWORD
+    return smtp_options
+
+
 def send_email(
     *,
     email_to: str,
     subject: str = "",
     html_content: str = "",
-) -> None:
+    smtp: Any = None,
+) -> Any:
+    """
+    Send an email right away, over the `smtp` backend if given so that its
+    connection is reused.
+    """
     assert settings.emails_enabled, "no provided configuration for email variables"
     message = emails.Message(
         subject=subject,
         html=html_content,
         mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
     )
-    smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
-    if settings.SMTP_TLS:
-        smtp_options["tls"] = True
-    elif settings.SMTP_SSL:
-        smtp_options["ssl"] = True
-    if settings.SMTP_USER:
-        smtp_options["user"] = settings.SMTP_USER
-    if settings.SMTP_PASSWORD:
-        smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, smtp=smtp_options)
+    response = message.send(to=email_to, smtp=smtp or get_smtp_options())
     logger.info(f"send email result: {response}")
+    return response
+
+
+def queue_email(
+    *,
+    session: Session,
+    email_to: str,
+    subject: str = "",
+    html_content: str = "",
+) -> None:
+    """
+    Store an email in the outbox, app/email_worker.py delivers it.
+    """
+    assert settings.emails_enabled, "no provided configuration for email variables"
+    session.add(
+        OutboxEmail(email_to=email_to, subject=subject, html_content=html_content)
+    )
+    session.commit()
 
 
 def generate_test_email(email_to: str) -> EmailData:
@@ -0,0 +1,113 @@
+"""
+Compare the CPU cost of compressing typical list pages with the bytes it
+saves, for each encoding and a few levels. The pages are GET /items/ and
+GET /users/ bodies built from generated rows, no database is needed:
+
+    python -m benchmarks.compression --limits 100 1000
+
+Pick COMPRESSION_ENCODINGS and the levels from the trade off that fits:
+CPU time is spent on every response, the bytes saved are worth most on slow
+client links.
+"""
+
+import argparse
+import functools
+import random
+import statistics
+import string
+import time
+import uuid
+from collections.abc import Callable
+
+from app.api.pagination import page_response
+from app.core.compression import (
+    BrotliCompressor,
+    Compressor,
+    GzipCompressor,
+    ZstdCompressor,
+)
+from app.models import Item, ItemPublic, User, UserPublic
+
+LEVELS: dict[str, tuple[Callable[[int], Compressor], list[int]]] = {
+    "gzip": (GzipCompressor, [1, 6, 9]),
+    "br": (BrotliCompressor, [1, 4, 6, 11]),
+    "zstd": (ZstdCompressor, [1, 3, 9, 19]),
+}
+
+
+def words(count: int) -> str:
+    return " ".join(
+        "".join(random.choices(string.ascii_lowercase, k=random.randint(3, 9)))
+        for _ in range(count)
+    )
+
+
+def items_page(limit: int) -> bytes:
+    owners = [uuid.uuid4() for _ in range(max(limit // 20, 1))]
+    items = [
+        Item(
+            title=words(3).capitalize(),
+            description=words(random.randint(5, 20)),
+            owner_id=random.choice(owners),
+        )
+        for _ in range(limit)
+    ]
+    return bytes(page_response(items, ItemPublic, count=100_000, next_cursor=None).body)
+
+
+def users_page(limit: int) -> bytes:
+    users = [
+        User(
+            email=f"{words(1)}.{words(1)}@example.com",
+            full_name=words(2).title(),
+            hashed_password="",
+        )
+        for _ in range(limit)
+    ]
+    return bytes(page_response(users, UserPublic, count=100_000, next_cursor=None).body)
+
+
+def measure(
+    make: Callable[[], Compressor], body: bytes, repeat: int
+) -> tuple[int, float]:
+    sizes = []
+    times = []
+    for _ in range(repeat):
+        start = time.process_time()
+        compressor = make()
+        size = len(compressor.compress(body) + compressor.finish())
+        times.append((time.process_time() - start) * 1000)
+        sizes.append(size)
+    return sizes[0], statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--limits", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    random.seed(0)
+
+    print(
+        f"{'page':<11} {'encoding':<9} {'bytes':>9} {'saved':>7} "
+        f"{'CPU ms':>8} {'KiB saved/CPU ms':>17}"
+    )
+    for name, build in [("items", items_page), ("users", users_page)]:
+        for limit in args.limits:
+            body = build(limit)
+            page = f"{name} {limit}"
+            print(f"{page:<11} {'identity':<9} {len(body):>9}")
+            for encoding, (compressor, levels) in LEVELS.items():
+                for level in levels:
+                    make = functools.partial(compressor, level)
+                    size, cpu_ms = measure(make, body, args.repeat)
+                    saved = len(body) - size
+                    print(
+                        f"{page:<11} {f'{encoding}-{level}':<9} {size:>9} "
+                        f"{saved / len(body):>7.0%} {cpu_ms:>8.3f} "
+                        f"{saved / 1024 / max(cpu_ms, 1e-3):>17.0f}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
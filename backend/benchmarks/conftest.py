@@ -0,0 +1,28 @@
+from collections.abc import Generator
+
+import pytest
+from sqlmodel import Session, col, select
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine, init_db
+from app.models import User
+
+# Users created by the benchmarks, removed again once they are done
+BENCH_EMAIL_PATTERN = "benchmark-%@example.com"
+
+
+@pytest.fixture(scope="session")
+def db() -> Generator[Session, None, None]:
+    with Session(engine) as session:
+        init_db(session)
+        yield session
+        # Through crud, so the user counter goes down with them
+        statement = select(User).where(col(User.email).like(BENCH_EMAIL_PATTERN))
+        for user in session.exec(statement).all():
+            crud.delete_user(session=session, db_user=user)
+
+
+@pytest.fixture(scope="session")
+def password() -> str:
+    return settings.FIRST_SUPERUSER_PASSWORD
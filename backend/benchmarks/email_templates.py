@@ -0,0 +1,64 @@
+"""
+Time rendering the password reset email, compiling the template on every call
+as render_email_template used to, against the cached Environment in app.utils:
+
+    python -m benchmarks.email_templates --number 2000
+"""
+
+import argparse
+import functools
+import timeit
+from pathlib import Path
+from typing import Any
+
+from jinja2 import Template
+
+from app.core.config import settings
+from app.utils import load_email_templates, render_email_template
+
+TEMPLATE_NAME = "reset_password.html"
+CONTEXT = {
+    "project_name": settings.PROJECT_NAME,
+    "username": "user@example.com",
+    "email": "user@example.com",
+    "valid_hours": settings.EMAIL_RESET_TOKEN_EXPIRE_HOURS,
+    "link": f"{settings.FRONTEND_HOST}/reset-password?token=x",
+}
+
+
+def render_uncached(*, template_name: str, context: dict[str, Any]) -> str:
+    template_str = (
+        Path(__file__).parent.parent
+        / "app"
+        / "email-templates"
+        / "build"
+        / template_name
+    ).read_text()
+    return Template(template_str).render(context)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    load_email_templates()
+    assert render_uncached(
+        template_name=TEMPLATE_NAME, context=CONTEXT
+    ) == render_email_template(template_name=TEMPLATE_NAME, context=CONTEXT)
+    for label, render in [
+        ("read and compile", render_uncached),
+        ("cached", render_email_template),
+    ]:
+        seconds = min(
+            timeit.repeat(
+                functools.partial(render, template_name=TEMPLATE_NAME, context=CONTEXT),
+                number=args.number,
+                repeat=5,
+            )
+        )
+        print(f"{label:<18} {seconds / args.number * 1e6:8.1f} us per email")
+
+
+if __name__ == "__main__":
+    main()
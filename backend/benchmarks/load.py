@@ -0,0 +1,141 @@
+"""
+Load test a running backend and report throughput and latency percentiles.
+
+Start the API once per mode, for example with DB_ASYNC=false and DB_ASYNC=true
+on two ports, then point this script at each of them:
+
+    python -m benchmarks.load --base-url http://localhost:8000 --concurrency 64
+
+The mixed scenario interleaves logins with item reads, so the item latency
+shows how much a burst of bcrypt work slows down unrelated requests.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+from collections.abc import Awaitable, Callable
+
+import httpx
+
+from app.core.config import settings
+
+Scenario = Callable[[httpx.AsyncClient, dict[str, str]], Awaitable[httpx.Response]]
+
+# Share of requests in the mixed scenario that are logins
+LOGIN_SHARE = 0.2
+
+
+async def login_request(client: httpx.AsyncClient) -> httpx.Response:
+    return await client.post(
+        f"{settings.API_V1_STR}/login/access-token",
+        data={
+            "username": settings.FIRST_SUPERUSER,
+            "password": settings.FIRST_SUPERUSER_PASSWORD,
+        },
+    )
+
+
+async def login(client: httpx.AsyncClient) -> dict[str, str]:
+    response = await login_request(client)
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def read_items(
+    client: httpx.AsyncClient, headers: dict[str, str]
+) -> httpx.Response:
+    return await client.get(
+        f"{settings.API_V1_STR}/items/", headers=headers, params={"limit": 100}
+    )
+
+
+async def create_item(
+    client: httpx.AsyncClient, headers: dict[str, str]
+) -> httpx.Response:
+    return await client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=headers,
+        json={"title": "load test", "description": "created by benchmarks.load"},
+    )
+
+
+async def mixed(client: httpx.AsyncClient, headers: dict[str, str]) -> httpx.Response:
+    if random.random() < LOGIN_SHARE:
+        return await login_request(client)
+    return await read_items(client, headers)
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "items": read_items,
+    "create": create_item,
+    "mixed": mixed,
+}
+
+
+async def worker(
+    client: httpx.AsyncClient,
+    headers: dict[str, str],
+    scenario: Scenario,
+    deadline: float,
+    latencies: dict[str, list[float]],
+    statuses: Counter[int],
+) -> None:
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await scenario(client, headers)
+            statuses[response.status_code] += 1
+        except httpx.HTTPError:
+            statuses[0] += 1
+            continue
+        label = f"{response.request.method} {response.request.url.path}"
+        latencies[label].append((time.perf_counter() - start) * 1000)
+
+
+async def run(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=args.base_url, limits=limits, timeout=args.timeout
+    ) as client:
+        headers = await login(client)
+        scenario = SCENARIOS[args.scenario]
+        latencies: dict[str, list[float]] = defaultdict(list)
+        statuses: Counter[int] = Counter()
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(
+            *(
+                worker(client, headers, scenario, deadline, latencies, statuses)
+                for _ in range(args.concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - started
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"scenario     {args.scenario} x {args.concurrency} for {elapsed:.1f}s")
+    print(f"requests     {total} ({dict(statuses)})")
+    print(f"throughput   {total / elapsed:.1f} req/s")
+    for label, values in sorted(latencies.items()):
+        percentiles = statistics.quantiles(values, n=100)
+        print(
+            f"{label}: {len(values)} requests, latency ms p50 {percentiles[49]:.1f}  "
+            f"p95 {percentiles[94]:.1f}  p99 {percentiles[98]:.1f}  "
+            f"max {max(values):.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="items")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
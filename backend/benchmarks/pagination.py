@@ -0,0 +1,137 @@
+"""
+Compare offset and keyset (cursor) paging on GET /items/.
+
+Seeds a large item table, then times the same page depth with `skip` and with
+`cursor`. Run it from the backend directory against a disposable database:
+
+    python -m benchmarks.pagination --rows 3000000
+"""
+
+import argparse
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.api.pagination import encode_cursor
+from app.core.config import settings
+from app.core.db import engine, init_db
+from app.main import app
+from app.tests.utils.utils import get_superuser_token_headers
+
+BENCH_EMAIL_PATTERN = "pagination-bench-%@example.com"
+
+
+def seed(session: Session, rows: int, owners: int) -> None:
+    session.execute(
+        text(
+            'INSERT INTO "user" (id, email, is_active, is_superuser, hashed_password) '
+            "SELECT gen_random_uuid(), 'pagination-bench-' || g || '@example.com', "
+            "true, false, 'x' FROM generate_series(1, :owners) g"
+        ),
+        {"owners": owners},
+    )
+    session.execute(
+        text(
+            "INSERT INTO item (id, title, owner_id) "
+            "SELECT gen_random_uuid(), 'item ' || g, "
+            "owners.ids[1 + g % array_length(owners.ids, 1)] "
+            "FROM generate_series(1, :rows) g, "
+            '(SELECT array_agg(id) AS ids FROM "user" WHERE email LIKE :pattern) owners'
+        ),
+        {"rows": rows, "pattern": BENCH_EMAIL_PATTERN},
+    )
+    session.commit()
+    session.execute(text("ANALYZE item"))
+    session.commit()
+
+
+def cleanup(session: Session) -> None:
+    session.execute(
+        text(
+            "DELETE FROM item WHERE owner_id IN "
+            '(SELECT id FROM "user" WHERE email LIKE :pattern)'
+        ),
+        {"pattern": BENCH_EMAIL_PATTERN},
+    )
+    session.execute(
+        text('DELETE FROM "user" WHERE email LIKE :pattern'),
+        {"pattern": BENCH_EMAIL_PATTERN},
+    )
+    session.commit()
+
+
+def cursor_at(session: Session, offset: int) -> str | None:
+    if offset == 0:
+        return None
+    row = session.execute(
+        text("SELECT owner_id, id FROM item ORDER BY owner_id, id OFFSET :o LIMIT 1"),
+        {"o": offset - 1},
+    ).one()
+    # As items_cursor encodes them for the default sort
+    return encode_cursor("", row.owner_id, row.id)
+
+
+def time_request(
+    client: TestClient, headers: dict[str, str], params: dict[str, str | int]
+) -> float:
+    start = time.perf_counter()
+    response = client.get(
+        f"{settings.API_V1_STR}/items/", headers=headers, params=params
+    )
+    elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    return elapsed * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--owners", type=int, default=1_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--pages", type=int, nargs="+", default=[1, 10, 100, 1_000, 10_000]
+    )
+    parser.add_argument("--keep", action="store_true", help="keep the seeded rows")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        init_db(session)
+        cleanup(session)
+        print(f"Seeding {args.rows} items across {args.owners} owners...")
+        seed(session, args.rows, args.owners)
+        try:
+            with TestClient(app) as client:
+                headers = get_superuser_token_headers(client)
+                print(f"{'page':>8} {'offset ms':>12} {'cursor ms':>12}")
+                for page in args.pages:
+                    skip = (page - 1) * args.limit
+                    if skip >= args.rows:
+                        break
+                    offset_params: dict[str, str | int] = {
+                        "skip": skip,
+                        "limit": args.limit,
+                    }
+                    cursor_params: dict[str, str | int] = {"limit": args.limit}
+                    cursor = cursor_at(session, skip)
+                    if cursor:
+                        cursor_params["cursor"] = cursor
+                    offset_ms = statistics.median(
+                        time_request(client, headers, offset_params)
+                        for _ in range(args.repeat)
+                    )
+                    cursor_ms = statistics.median(
+                        time_request(client, headers, cursor_params)
+                        for _ in range(args.repeat)
+                    )
+                    print(f"{page:>8} {offset_ms:>12.2f} {cursor_ms:>12.2f}")
+        finally:
+            if not args.keep:
+                cleanup(session)
+
+
+if __name__ == "__main__":
+    main()
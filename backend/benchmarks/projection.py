@@ -0,0 +1,93 @@
+"""
+Compare loading list pages as ORM entities with selecting only the public
+columns, as GET /items/ and GET /users/ do. For each page size it reports the
+median time and the tracemalloc peak of running the query and building the
+response model. Run it from the backend directory against a disposable
+database:
+
+    python -m benchmarks.projection --rows 200000 --limits 100 1000 5000
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+from sqlmodel import Session, col, select
+
+from app.api.pagination import public_columns
+from app.core.db import engine, init_db
+from app.models import Item, ItemPublic, ItemsPublic, User, UserPublic, UsersPublic
+from benchmarks.pagination import cleanup, seed
+
+
+def load_page(
+    entity: type[Any], columns: list[Any] | None, limit: int
+) -> Callable[[], Any]:
+    statement = select(*columns) if columns else select(entity)
+    statement = statement.order_by(col(entity.id)).limit(limit)
+    page_model = ItemsPublic if entity is Item else UsersPublic
+
+    def run() -> Any:
+        # A new session per call, like a request
+        with Session(engine) as session:
+            rows = session.exec(statement).all()
+            return page_model(data=rows, count=len(rows))
+
+    return run
+
+
+def measure(run: Callable[[], Any], repeat: int) -> tuple[float, int]:
+    run()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--owners", type=int, default=10_000)
+    parser.add_argument("--limits", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        init_db(session)
+        cleanup(session)
+        print(f"Seeding {args.rows} items across {args.owners} owners...")
+        seed(session, args.rows, args.owners)
+        try:
+            print(
+                f"{'page':<12} {'entities ms':>12} {'columns ms':>11} "
+                f"{'entities KiB':>13} {'columns KiB':>12}"
+            )
+            for entity, public in [(Item, ItemPublic), (User, UserPublic)]:
+                for limit in args.limits:
+                    entities_ms, entities_peak = measure(
+                        load_page(entity, None, limit), args.repeat
+                    )
+                    columns_ms, columns_peak = measure(
+                        load_page(entity, public_columns(entity, public), limit),
+                        args.repeat,
+                    )
+                    print(
+                        f"{entity.__name__ + ' ' + str(limit):<12} "
+                        f"{entities_ms:>12.2f} {columns_ms:>11.2f} "
+                        f"{entities_peak / 1024:>13.0f} {columns_peak / 1024:>12.0f}"
+                    )
+        finally:
+            cleanup(session)
+
+
+if __name__ == "__main__":
+    main()
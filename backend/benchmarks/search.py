@@ -0,0 +1,130 @@
+"""
+Time GET /items/search on a large item table, for rare and common words.
+
+Seeds items whose titles and descriptions draw from a skewed vocabulary, a few
+words are in most items and most words in very few, then reports latency
+percentiles per word. Run it from the backend directory against a disposable
+database:
+
+    python -m benchmarks.search --rows 3000000
+
+Words found in more than ITEM_SEARCH_MAX_RANKED items only rank the first ones
+by id, compare with ITEM_SEARCH_MAX_RANKED=0 to see what ranking every match
+costs.
+"""
+
+import argparse
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine, init_db
+from app.main import app
+from app.tests.utils.utils import get_superuser_token_headers
+
+BENCH_EMAIL_PATTERN = "search-bench-%@example.com"
+# Word n is picked with a probability that falls quickly with n
+VOCABULARY = 100_000
+
+
+def seed(session: Session, rows: int, owners: int) -> None:
+    session.execute(
+        text(
+            'INSERT INTO "user" (id, email, is_active, is_superuser, hashed_password) '
+            "SELECT gen_random_uuid(), 'search-bench-' || g || '@example.com', "
+            "true, false, 'x' FROM generate_series(1, :owners) g"
+        ),
+        {"owners": owners},
+    )
+    word = "'word' || floor(pow(random(), 4) * :vocabulary)::int"
+    session.execute(
+        text(
+            "INSERT INTO item (id, title, description, owner_id) "
+            f"SELECT gen_random_uuid(), {word} || ' ' || {word}, "
+            f"{word} || ' ' || {word} || ' ' || {word}, "
+            "owners.ids[1 + g % array_length(owners.ids, 1)] "
+            "FROM generate_series(1, :rows) g, "
+            '(SELECT array_agg(id) AS ids FROM "user" WHERE email LIKE :pattern) owners'
+        ),
+        {"rows": rows, "vocabulary": VOCABULARY, "pattern": BENCH_EMAIL_PATTERN},
+    )
+    session.commit()
+    session.execute(text("ANALYZE item"))
+    session.commit()
+
+
+def cleanup(session: Session) -> None:
+    session.execute(
+        text('DELETE FROM "user" WHERE email LIKE :pattern'),
+        {"pattern": BENCH_EMAIL_PATTERN},
+    )
+    session.commit()
+
+
+def matches(session: Session, word: str) -> int:
+    count: int = session.execute(
+        text(
+            "SELECT count(*) FROM item "
+            "WHERE search_vector @@ websearch_to_tsquery('english', :word)"
+        ),
+        {"word": word},
+    ).scalar_one()
+    return count
+
+
+def time_request(
+    client: TestClient, headers: dict[str, str], params: dict[str, str | int]
+) -> float:
+    start = time.perf_counter()
+    response = client.get(
+        f"{settings.API_V1_STR}/items/search", headers=headers, params=params
+    )
+    elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    return elapsed * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--owners", type=int, default=1_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument(
+        "--words", type=int, nargs="+", default=[50_000, 10_000, 1_000, 100, 0]
+    )
+    parser.add_argument("--keep", action="store_true", help="keep the seeded rows")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        init_db(session)
+        cleanup(session)
+        print(f"Seeding {args.rows} items across {args.owners} owners...")
+        seed(session, args.rows, args.owners)
+        try:
+            with TestClient(app) as client:
+                headers = get_superuser_token_headers(client)
+                print(f"{'q':<12} {'matches':>9} {'p50 ms':>9} {'p95 ms':>9}")
+                for n in args.words:
+                    word = f"word{n}"
+                    params: dict[str, str | int] = {"q": word, "limit": args.limit}
+                    times = [
+                        time_request(client, headers, params)
+                        for _ in range(args.repeat)
+                    ]
+                    p95 = statistics.quantiles(times, n=20)[-1]
+                    print(
+                        f"{word:<12} {matches(session, word):>9} "
+                        f"{statistics.median(times):>9.2f} {p95:>9.2f}"
+                    )
+        finally:
+            if not args.keep:
+                cleanup(session)
+
+
+if __name__ == "__main__":
+    main()
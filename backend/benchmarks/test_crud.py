@@ -0,0 +1,25 @@
+import itertools
+from typing import Any
+
+from pytest_benchmark.fixture import BenchmarkFixture  # type: ignore[import-untyped]
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.models import UserCreate
+
+_emails = (f"benchmark-{i}@example.com" for i in itertools.count())
+
+
+def test_create_user(benchmark: BenchmarkFixture, db: Session, password: str) -> None:
+    def setup() -> tuple[tuple[()], dict[str, Any]]:
+        user_create = UserCreate(email=next(_emails), password=password)
+        return (), {"session": db, "user_create": user_create}
+
+    # Includes hashing the password, so like bcrypt only a few rounds
+    benchmark.pedantic(crud.create_user, setup=setup, rounds=5, warmup_rounds=1)
+
+
+def test_get_user_by_email(benchmark: BenchmarkFixture, db: Session) -> None:
+    user = benchmark(crud.get_user_by_email, session=db, email=settings.FIRST_SUPERUSER)
+    assert user
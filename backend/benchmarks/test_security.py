@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from pytest_benchmark.fixture import BenchmarkFixture  # type: ignore[import-untyped]
+
+from app.api.deps import _decode_token
+from app.core import security
+
+
+def test_create_access_token(benchmark: BenchmarkFixture) -> None:
+    benchmark(security.create_access_token, "subject", timedelta(minutes=30))
+
+
+def test_decode_access_token(benchmark: BenchmarkFixture) -> None:
+    token = security.create_access_token("subject", timedelta(minutes=30))
+    payload = benchmark(_decode_token, token)
+    assert payload.sub == "subject"
+
+
+# bcrypt takes hundreds of milliseconds by design, a few rounds are enough
+
+
+def test_get_password_hash(benchmark: BenchmarkFixture, password: str) -> None:
+    benchmark.pedantic(
+        security.get_password_hash, (password,), rounds=5, warmup_rounds=1
+    )
+
+
+def test_verify_password(benchmark: BenchmarkFixture, password: str) -> None:
+    hashed_password = security.get_password_hash(password)
+    assert benchmark.pedantic(
+        security.verify_password,
+        (password, hashed_password),
+        rounds=5,
+        warmup_rounds=1,
+    )
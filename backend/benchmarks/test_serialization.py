@@ -0,0 +1,75 @@
+import uuid
+from typing import Any
+
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pytest_benchmark.fixture import BenchmarkFixture  # type: ignore[import-untyped]
+from sqlmodel import SQLModel
+
+from app.api.pagination import page_response
+from app.core.config import settings
+from app.main import app
+from app.models import Item, ItemPublic, ItemsPublic, User, UserPublic, UsersPublic
+
+
+def response_field(path: str) -> Any:
+    for route in app.routes:
+        if (
+            isinstance(route, APIRoute)
+            and route.path == path
+            and "GET" in route.methods
+        ):
+            return route.response_field
+    raise LookupError(path)
+
+
+def serialize(field: Any, model: type[SQLModel], rows: list[Any]) -> Any:
+    # What the list routes build, and FastAPI then does with it because of
+    # their response_model
+    content = model(data=rows, count=len(rows))
+    value, errors = field.validate(content, {}, loc=("response",))
+    assert not errors
+    return JSONResponse(field.serialize(value)).body
+
+
+def make_items(rows: int) -> list[Item]:
+    owner_id = uuid.uuid4()
+    return [
+        Item(title=f"Item {i}", description="Benchmark item", owner_id=owner_id)
+        for i in range(rows)
+    ]
+
+
+def make_users(rows: int) -> list[User]:
+    return [
+        User(email=f"user{i}@example.com", full_name="User", hashed_password="x")
+        for i in range(rows)
+    ]
+
+
+@pytest.mark.parametrize("rows", [100, 1000])
+def test_items_public(benchmark: BenchmarkFixture, rows: int) -> None:
+    field = response_field(f"{settings.API_V1_STR}/items/")
+    benchmark(serialize, field, ItemsPublic, make_items(rows))
+
+
+@pytest.mark.parametrize("rows", [100, 1000])
+def test_users_public(benchmark: BenchmarkFixture, rows: int) -> None:
+    field = response_field(f"{settings.API_V1_STR}/users/")
+    benchmark(serialize, field, UsersPublic, make_users(rows))
+
+
+# settings.FAST_LIST_RESPONSES
+
+
+@pytest.mark.parametrize("rows", [100, 1000])
+def test_items_page_response(benchmark: BenchmarkFixture, rows: int) -> None:
+    items = make_items(rows)
+    benchmark(page_response, items, ItemPublic, count=rows, next_cursor=None)
+
+
+@pytest.mark.parametrize("rows", [100, 1000])
+def test_users_page_response(benchmark: BenchmarkFixture, rows: int) -> None:
+    users = make_users(rows)
+    benchmark(page_response, users, UserPublic, count=rows, next_cursor=None)
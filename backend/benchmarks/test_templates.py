@@ -0,0 +1,17 @@
+from pytest_benchmark.fixture import BenchmarkFixture  # type: ignore[import-untyped]
+
+from app.utils import generate_password_reset_token, render_email_template
+
+
+def test_render_reset_password_email(benchmark: BenchmarkFixture) -> None:
+    context = {
+        "project_name": "Benchmark",
+        "username": "user@example.com",
+        "email": "user@example.com",
+        "valid_hours": 48,
+        "link": f"https://example.com/reset-password?token={generate_password_reset_token('user@example.com')}",
+    }
+    html_content = benchmark(
+        render_email_template, template_name="reset_password.html", context=context
+    )
+    assert "user@example.com" in html_content
@@ -0,0 +1,8 @@
+#!/usr/bin/env bash
+
+set -e
+set -x
+
+# Save a baseline with --benchmark-save=<name>, compare against it with
+# --benchmark-compare=<id> or `pytest-benchmark --storage benchmarks/baselines compare`
+pytest benchmarks --benchmark-only --benchmark-storage=benchmarks/baselines "$@"
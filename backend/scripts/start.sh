@@ -0,0 +1,11 @@
+#! /usr/bin/env bash
+set -e
+set -x
+
+# Each worker writes its metrics here, samples left by a previous run would be
+# added to the new ones
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+exec fastapi run --workers 4 app/main.py